@@ -8,6 +8,8 @@ Usage:
     python 01_download_raw_data.py
     python 01_download_raw_data.py --year 2023
     python 01_download_raw_data.py --csv  # Download CSV instead of SAS
+    python 01_download_raw_data.py --workers 4  # Years downloaded concurrently
+    python 01_download_raw_data.py --check  # List files and verify them against the raw store
 
 Manual Fallback:
     If script fails, download manually from:
@@ -17,61 +19,31 @@ Manual Fallback:
 import os
 import sys
 import argparse
-import requests
 from pathlib import Path
-from tqdm import tqdm
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
 from config import RAW_DIR, DATA_YEARS, DOE_BASE_URL, DOE_DOWNLOAD_PAGE
+from http_session import DEFAULT_RETRIES, DEFAULT_BACKOFF, print_network_summary
+from downloader import (
+    DownloadManifest, DownloadScheduler, DEFAULT_WORKERS, DEFAULT_PER_HOST,
+    DOWNLOADED, NOT_MODIFIED, FAILED
+)
+from raw_store import RawStore, print_verification
 
+# Per-request timeout (seconds)
+DOE_TIMEOUT = 60
 
-def download_file(url: str, dest_path: Path, desc: str = "") -> bool:
-    """
-    Download a file with progress bar.
-    Returns True if successful, False otherwise.
-    """
-    try:
-        # First check if file exists and skip
-        if dest_path.exists():
-            print(f"  Already exists: {dest_path.name}")
-            return True
-
-        # Stream download with progress
-        response = requests.get(url, stream=True, timeout=60)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-
-        with open(dest_path, 'wb') as f, tqdm(
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-            desc=desc or dest_path.name,
-            leave=False
-        ) as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    pbar.update(len(chunk))
-
-        return True
-
-    except requests.exceptions.RequestException as e:
-        print(f"  Failed: {e}")
-        # Clean up partial download
-        if dest_path.exists():
-            dest_path.unlink()
-        return False
-
-
-def download_year(year: int, file_type: str = "csv") -> bool:
+
+def download_year(year: int, scheduler: DownloadScheduler, file_type: str = "csv") -> str:
     """
     Download crime data file for a given year.
     Tries SAS format first, falls back to CSV.
-    Returns True if successful.
+    Returns DOWNLOADED, NOT_MODIFIED (already current on disk) or FAILED.
+
+    Runs as a scheduler job, so several years download concurrently.
     """
+    log = scheduler.log
     year_dir = RAW_DIR / str(year)
     year_dir.mkdir(parents=True, exist_ok=True)
 
@@ -80,29 +52,35 @@ def download_year(year: int, file_type: str = "csv") -> bool:
         sas_url = f"{DOE_BASE_URL}/{year}/Crime{year}.sas7bdat"
         sas_path = year_dir / f"Crime{year}.sas7bdat"
 
-        print(f"\n{year}: Downloading SAS format...")
-        if download_file(sas_url, sas_path, f"Crime{year}.sas7bdat"):
-            print(f"  Downloaded: {sas_path.name}")
-            return True
+        log(f"{year}: Downloading SAS format...")
+        status = scheduler.download(sas_url, sas_path, DOE_TIMEOUT)
+        if status != FAILED:
+            if status == DOWNLOADED:
+                log(f"  Downloaded: {year}/{sas_path.name}")
+            return status
 
     # Try CSV format (more reliable)
     csv_url = f"{DOE_BASE_URL}/{year}/Crime{year}.csv"
     csv_path = year_dir / f"Crime{year}.csv"
 
-    print(f"\n{year}: Downloading CSV format...")
-    if download_file(csv_url, csv_path, f"Crime{year}.csv"):
-        print(f"  Downloaded: {csv_path.name}")
-        return True
+    log(f"{year}: Downloading CSV format...")
+    status = scheduler.download(csv_url, csv_path, DOE_TIMEOUT)
+    if status != FAILED:
+        if status == DOWNLOADED:
+            log(f"  Downloaded: {year}/{csv_path.name}")
+        return status
 
     # Try alternative CSV naming
     csv_url_alt = f"{DOE_BASE_URL}/{year}/crime{year}.csv"
-    if download_file(csv_url_alt, csv_path, f"crime{year}.csv"):
-        print(f"  Downloaded: {csv_path.name}")
-        return True
+    status = scheduler.download(csv_url_alt, csv_path, DOE_TIMEOUT)
+    if status != FAILED:
+        if status == DOWNLOADED:
+            log(f"  Downloaded: {year}/{csv_path.name}")
+        return status
 
-    print(f"  Could not download {year} data")
-    print(f"  Try manual download from: {DOE_DOWNLOAD_PAGE}")
-    return False
+    log(f"  Could not download {year} data")
+    log(f"  Try manual download from: {DOE_DOWNLOAD_PAGE}")
+    return FAILED
 
 
 def check_existing_files() -> dict:
@@ -140,12 +118,36 @@ def main():
     parser.add_argument(
         "--check",
         action="store_true",
-        help="Check existing files without downloading"
+        help="Check existing files and verify their integrity without downloading"
     )
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Re-download even if files exist"
+        help="Re-download even if the server reports files as unchanged"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of years to download (or files to verify) concurrently (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DEFAULT_PER_HOST,
+        help=f"Maximum concurrent requests to one host (default: {DEFAULT_PER_HOST})"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Retries per request on connection errors and 429/5xx (default: {DEFAULT_RETRIES})"
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=DEFAULT_BACKOFF,
+        help=f"Base retry backoff in seconds, doubled per retry (default: {DEFAULT_BACKOFF})"
     )
 
     args = parser.parse_args()
@@ -157,6 +159,7 @@ def main():
     print(f"Source: {DOE_BASE_URL}")
     print(f"Target: {RAW_DIR.absolute()}")
     print(f"Format: {file_type.upper()}")
+    print(f"Workers: {args.workers} ({args.per_host} per host)")
 
     # Check existing files
     if args.check:
@@ -169,30 +172,38 @@ def main():
                     print(f"  {year}: {name} ({size_mb:.1f} MB)")
         else:
             print("\nNo existing files found.")
+
+        # Re-hash the cataloged downloads rather than trusting their presence
+        statuses = RawStore(RAW_DIR).verify(
+            tuple(f"{year}/" for year in DATA_YEARS), workers=args.workers
+        )
+        if not print_verification(statuses):
+            sys.exit(1)
         return
 
-    # Handle force re-download
+    # Existing files are revalidated with conditional requests; force mode
+    # re-downloads them, replacing each file only once its new copy is complete
     if args.force:
         print("\nForce mode: Will re-download all files")
-        import shutil
-        for year in DATA_YEARS:
-            year_dir = RAW_DIR / str(year)
-            if year_dir.exists():
-                shutil.rmtree(year_dir)
 
     # Create raw directory
     RAW_DIR.mkdir(parents=True, exist_ok=True)
 
     # Download
     years_to_download = [args.year] if args.year else DATA_YEARS
-    successful = []
-    failed = []
+    scheduler = DownloadScheduler(
+        args.workers, args.per_host, DownloadManifest(RAW_DIR), force=args.force,
+        retries=args.retries, backoff=args.backoff, store=RawStore(RAW_DIR)
+    )
+    results = scheduler.run({
+        year: lambda sched, year=year: download_year(year, sched, file_type)
+        for year in years_to_download
+    })
+    successful = [year for year, status in results.items() if status != FAILED]
+    unchanged = [year for year, status in results.items() if status == NOT_MODIFIED]
+    failed = [year for year, status in results.items() if status == FAILED]
 
-    for year in years_to_download:
-        if download_year(year, file_type):
-            successful.append(year)
-        else:
-            failed.append(year)
+    scheduler.session.close()
 
     # Summary
     print("\n" + "=" * 60)
@@ -201,11 +212,15 @@ def main():
     print(f"Successful: {len(successful)} years")
     if successful:
         print(f"  Years: {', '.join(map(str, successful))}")
+    if unchanged:
+        print(f"  Not modified since last download: {', '.join(map(str, unchanged))}")
     if failed:
         print(f"\nFailed: {len(failed)} years")
         print(f"  Years: {', '.join(map(str, failed))}")
         print(f"\nManual download: {DOE_DOWNLOAD_PAGE}")
 
+    print_network_summary(scheduler.session)
+
     print("\n" + "-" * 60)
     print("Next steps:")
     print("1. Verify downloads in data/raw/")
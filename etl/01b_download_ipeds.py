@@ -18,23 +18,33 @@ Usage:
     python 01b_download_ipeds.py
     python 01b_download_ipeds.py --year 2023
     python 01b_download_ipeds.py --ef-only  # Download only EF files for 2015-2020
+    python 01b_download_ipeds.py --workers 4  # Files downloaded concurrently
+    python 01b_download_ipeds.py --parquet    # Stream needed CSVs to Parquet, no extraction
+    python 01b_download_ipeds.py --check      # List files and verify zips against the raw store
 """
 
 import os
 import sys
 import argparse
-import requests
 import zipfile
+import pyarrow as pa
 from pathlib import Path
-from tqdm import tqdm
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
-from config import PROJECT_ROOT
+from config import RAW_DIR
+from ipeds import STREAMED_FAMILIES, zip_family, data_member, stream_member_to_parquet
+from http_session import DEFAULT_RETRIES, DEFAULT_BACKOFF, print_network_summary
+from downloader import (
+    DownloadManifest, DownloadScheduler, DEFAULT_WORKERS, DEFAULT_PER_HOST,
+    NOT_MODIFIED, FAILED
+)
+from raw_store import RawStore, print_verification
 
 # IPEDS configuration
-IPEDS_RAW_DIR = PROJECT_ROOT / "data" / "raw" / "ipeds"
+IPEDS_RAW_DIR = RAW_DIR / "ipeds"
 IPEDS_BASE_URL = "https://nces.ed.gov/ipeds/datacenter/data"
+IPEDS_TIMEOUT = 120  # Per-request timeout (seconds); the zips are large
 
 # Years to download (match our crime data range)
 IPEDS_YEARS = list(range(2015, 2024))  # 2015-2023
@@ -65,96 +75,116 @@ def get_files_for_year(year: int) -> list[str]:
     return files
 
 
-def download_file(url: str, dest_path: Path, desc: str = "") -> bool:
-    """
-    Download a file with progress bar.
-    Returns True if successful, False otherwise.
-    """
+def extract_zip(zip_path: Path, extract_dir: Path, log=print) -> bool:
+    """Extract a ZIP file to the specified directory."""
     try:
-        # First check if file exists and skip
-        if dest_path.exists():
-            print(f"  Already exists: {dest_path.name}")
-            return True
-
-        # Stream download with progress
-        response = requests.get(url, stream=True, timeout=120)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-
-        with open(dest_path, 'wb') as f, tqdm(
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-            desc=desc or dest_path.name,
-            leave=False
-        ) as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    pbar.update(len(chunk))
-
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            zf.extractall(extract_dir)
         return True
-
-    except requests.exceptions.RequestException as e:
-        print(f"  Failed: {e}")
-        # Clean up partial download
-        if dest_path.exists():
-            dest_path.unlink()
+    except zipfile.BadZipFile as e:
+        log(f"  Bad ZIP file: {e}")
         return False
 
 
-def extract_zip(zip_path: Path, extract_dir: Path) -> bool:
-    """Extract a ZIP file to the specified directory."""
+def is_extracted(zip_path: Path, extract_dir: Path) -> bool:
+    """Check whether every member of a ZIP file is already in extract_dir."""
     try:
         with zipfile.ZipFile(zip_path, 'r') as zf:
-            zf.extractall(extract_dir)
+            return all((extract_dir / name).exists() for name in zf.namelist())
+    except zipfile.BadZipFile:
+        return False
+
+
+def stream_to_parquet(zip_path: Path, extract_dir: Path, log=print) -> bool:
+    """
+    Stream the data CSV of a DRVEF/EF/HD zip straight into typed Parquet.
+
+    Only the {stem}.csv member is read (no _rv variants or dictionaries),
+    and nothing is extracted to disk; zips of other families are kept
+    as-is. See ipeds.py.
+    """
+    family = zip_family(zip_path.stem)
+    if family not in STREAMED_FAMILIES:
         return True
-    except zipfile.BadZipFile as e:
-        print(f"  Bad ZIP file: {e}")
+
+    try:
+        member = data_member(zip_path)
+        if member is None:
+            log(f"  No {zip_path.stem.lower()}.csv in {zip_path.name}")
+            return False
+        dest = extract_dir / f"{zip_path.stem.lower()}.parquet"
+        rows = stream_member_to_parquet(zip_path, member, family, dest)
+        log(f"    Streamed {member} -> {dest.name} ({rows:,} rows)")
+        return True
+    except (zipfile.BadZipFile, pa.ArrowInvalid, UnicodeDecodeError, KeyError) as e:
+        log(f"  Could not convert {zip_path.name}: {e}")
         return False
 
 
-def download_year(year: int, ef_only: bool = False) -> dict:
+def is_streamed(zip_path: Path, extract_dir: Path) -> bool:
+    """Check whether a zip's Parquet extract (if it has one) is current."""
+    if zip_family(zip_path.stem) not in STREAMED_FAMILIES:
+        return True
+    dest = extract_dir / f"{zip_path.stem.lower()}.parquet"
+    return dest.exists() and dest.stat().st_mtime >= zip_path.stat().st_mtime
+
+
+def files_to_download(year: int, ef_only: bool = False) -> list[str]:
     """
-    Download IPEDS files for a given year.
-    Returns dict with file status.
+    Get the files to download for a year, honoring --ef-only.
 
     Args:
         year: The year to download
         ef_only: If True, only download EF files (for adding historical FTE)
     """
+    files = get_files_for_year(year)
+
+    # If ef_only mode, only download EF files
+    if ef_only:
+        files = [f for f in files if f.startswith("EF") and not f.startswith("EFFY")]
+
+    return files
+
+
+def download_ipeds_file(
+    year: int,
+    filename: str,
+    scheduler: DownloadScheduler,
+    to_parquet: bool = False
+) -> str:
+    """
+    Download and extract one IPEDS zip for a given year.
+
+    Runs as a scheduler job, so all (year, file) pairs download concurrently.
+
+    With `to_parquet`, the needed data member is streamed to Parquet instead
+    of extracting every member. A zip the server reports as unchanged is
+    only re-extracted if its output is missing or stale.
+
+    Returns: "success", "not_modified", "download_failed" or "extract_failed"
+    """
     year_dir = IPEDS_RAW_DIR / str(year)
     year_dir.mkdir(parents=True, exist_ok=True)
 
-    results = {}
+    zip_url = f"{IPEDS_BASE_URL}/{filename}.zip"
+    zip_path = year_dir / f"{filename}.zip"
 
-    # Get files appropriate for this year
-    files_to_download = get_files_for_year(year)
+    scheduler.log(f"  Downloading {year}/{filename}.zip...")
 
-    # If ef_only mode, only download EF files
-    if ef_only:
-        files_to_download = [f for f in files_to_download if f.startswith("EF") and not f.startswith("EFFY")]
-
-    for filename in files_to_download:
-        zip_url = f"{IPEDS_BASE_URL}/{filename}.zip"
-        zip_path = year_dir / f"{filename}.zip"
-
-        print(f"  Downloading {filename}.zip...")
-
-        if download_file(zip_url, zip_path, filename):
-            # Extract the ZIP
-            print(f"    Extracting...")
-            if extract_zip(zip_path, year_dir):
-                results[filename] = "success"
-                print(f"    Done: {filename}")
-            else:
-                results[filename] = "extract_failed"
-        else:
-            results[filename] = "download_failed"
+    status = scheduler.download(zip_url, zip_path, IPEDS_TIMEOUT)
+    if status == FAILED:
+        return "download_failed"
+    is_current = is_streamed if to_parquet else is_extracted
+    if status == NOT_MODIFIED and is_current(zip_path, year_dir):
+        return "not_modified"
 
-    return results
+    # Extract the ZIP
+    extract = stream_to_parquet if to_parquet else extract_zip
+    if not extract(zip_path, year_dir, scheduler.log):
+        return "extract_failed"
+
+    scheduler.log(f"    Done: {year}/{filename}")
+    return "success"
 
 
 def check_existing_files() -> dict:
@@ -163,9 +193,9 @@ def check_existing_files() -> dict:
     for year in IPEDS_YEARS:
         year_dir = IPEDS_RAW_DIR / str(year)
         if year_dir.exists():
-            csvs = list(year_dir.glob("*.csv"))
-            if csvs:
-                existing[year] = [f.name for f in csvs]
+            files = sorted(year_dir.glob("*.csv")) + sorted(year_dir.glob("*.parquet"))
+            if files:
+                existing[year] = [f.name for f in files]
     return existing
 
 
@@ -181,18 +211,47 @@ def main():
     parser.add_argument(
         "--check",
         action="store_true",
-        help="Check existing files without downloading"
+        help="Check existing files and verify their integrity without downloading"
     )
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Re-download even if files exist"
+        help="Re-download even if the server reports files as unchanged"
     )
     parser.add_argument(
         "--ef-only",
         action="store_true",
         help="Download only EF files for 2015-2020 (for historical FTE calculation)"
     )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Stream only the DRVEF/EF/HD data CSVs from each zip to typed Parquet (no extraction)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of files to download (or verify) concurrently (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DEFAULT_PER_HOST,
+        help=f"Maximum concurrent requests to one host (default: {DEFAULT_PER_HOST})"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Retries per request on connection errors and 429/5xx (default: {DEFAULT_RETRIES})"
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=DEFAULT_BACKOFF,
+        help=f"Base retry backoff in seconds, doubled per retry (default: {DEFAULT_BACKOFF})"
+    )
 
     args = parser.parse_args()
 
@@ -201,6 +260,7 @@ def main():
     print("=" * 60)
     print(f"Source: {IPEDS_BASE_URL}")
     print(f"Target: {IPEDS_RAW_DIR.absolute()}")
+    print(f"Workers: {args.workers} ({args.per_host} per host)")
 
     if args.ef_only:
         print(f"Mode: EF files only (for historical FTE)")
@@ -217,14 +277,17 @@ def main():
                 print(f"  {year}: {', '.join(files)}")
         else:
             print("\nNo existing files found.")
+
+        # Re-hash the cataloged zips rather than trusting their presence
+        statuses = RawStore(RAW_DIR).verify("ipeds/", workers=args.workers)
+        if not print_verification(statuses):
+            sys.exit(1)
         return
 
-    # Handle force re-download
+    # Existing files are revalidated with conditional requests; force mode
+    # re-downloads them, replacing each file only once its new copy is complete
     if args.force:
         print("\nForce mode: Will re-download all files")
-        import shutil
-        if IPEDS_RAW_DIR.exists():
-            shutil.rmtree(IPEDS_RAW_DIR)
 
     # Create raw directory
     IPEDS_RAW_DIR.mkdir(parents=True, exist_ok=True)
@@ -237,12 +300,24 @@ def main():
     else:
         years_to_download = IPEDS_YEARS
 
-    all_results = {}
+    # One job per (year, file), all run concurrently
+    scheduler = DownloadScheduler(
+        args.workers, args.per_host, DownloadManifest(IPEDS_RAW_DIR), force=args.force,
+        retries=args.retries, backoff=args.backoff, store=RawStore(RAW_DIR)
+    )
+    results = scheduler.run({
+        (year, filename): lambda sched, year=year, filename=filename: download_ipeds_file(
+            year, filename, sched, args.parquet
+        )
+        for year in years_to_download
+        for filename in files_to_download(year, args.ef_only)
+    })
+
+    all_results = {year: {} for year in years_to_download}
+    for (year, filename), status in results.items():
+        all_results[year][filename] = status
 
-    for year in years_to_download:
-        print(f"\n{year}:")
-        results = download_year(year, ef_only=args.ef_only)
-        all_results[year] = results
+    scheduler.session.close()
 
     # Summary
     print("\n" + "=" * 60)
@@ -252,24 +327,31 @@ def main():
     success_count = sum(
         1 for year_results in all_results.values()
         for status in year_results.values()
-        if status == "success"
+        if status in ("success", "not_modified")
+    )
+    unchanged_count = sum(
+        1 for year_results in all_results.values()
+        for status in year_results.values()
+        if status == "not_modified"
     )
     total_count = sum(len(r) for r in all_results.values())
 
-    print(f"Successful: {success_count}/{total_count} files")
+    print(f"Successful: {success_count}/{total_count} files ({unchanged_count} not modified)")
 
     # Show any failures
     failures = [
         (year, fname, status)
         for year, results in all_results.items()
         for fname, status in results.items()
-        if status != "success"
+        if status not in ("success", "not_modified")
     ]
     if failures:
         print("\nFailed downloads:")
         for year, fname, status in failures:
             print(f"  {year}/{fname}: {status}")
 
+    print_network_summary(scheduler.session)
+
     print("\n" + "-" * 60)
     print("Next steps:")
     print("1. Verify downloads in data/raw/ipeds/")
@@ -7,6 +7,21 @@ The DOE data is organized as:
 - Each file covers 3 years with suffixes like 212223 (2021-2022-2023)
 - Columns have year suffixes: RAPE21, MURD22, etc.
 
+Yearly CSV downloads from 01_download_raw_data.py (data/raw/{year}/Crime{year}.csv)
+hold one year for every geography, with geography-suffixed columns (MURD11,
+RAPE13, ...; see OFFENSE_FIELDS in config). They are parsed with pyarrow's
+multithreaded CSV reader and take precedence over SAS files for their year.
+
+Output: data/curated/facts/incidents/year=YYYY/offense_family=F/part-0.parquet
+(zstd, sorted by unitid within each partition). year and offense_family are
+only encoded in the directory names, as in any Hive-partitioned dataset.
+
+With --engine duckdb the raw files are registered with DuckDB as Arrow tables
+and the unpivot, labeling and groupby run as one SQL pipeline; each partition
+of the result is fetched as Arrow and written with the same schema as the
+pandas engine. The default pandas engine caches extracted
+partitions per source file and only re-extracts what changed.
+
 Output Schema:
     year: int16                  # 2015-2024
     unitid: int32                # Institution ID
@@ -18,19 +33,39 @@ Output Schema:
 Usage:
     python 02_transform_to_parquet.py
     python 02_transform_to_parquet.py --ivy-only
+    python 02_transform_to_parquet.py --workers 16
+    python 02_transform_to_parquet.py --no-staging
+    python 02_transform_to_parquet.py --full-refresh
+    python 02_transform_to_parquet.py --engine duckdb
 """
 
 import sys
 import argparse
+import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import re
+import csv
+import json
+import hashlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Callable, Dict, Iterator, Optional, List, Tuple
 from tqdm import tqdm
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
-from config import RAW_DIR, CURATED_DIR, IVY_UNITIDS, PROCESS_ALL_SCHOOLS
+from config import (
+    RAW_DIR, STAGED_DIR, CURATED_DIR, EXTRACT_CACHE_DIR, IVY_UNITIDS, PROCESS_ALL_SCHOOLS,
+    GEO_CODES, OFFENSE_FIELDS, FIELD_NAME_ALIASES, get_offense_info
+)
+from staging import staged_path, write_staged, iter_staged_chunks, read_staged_table
+from raw_store import content_digest
+from utils import file_fingerprint, load_manifest, save_manifest
 
 # =============================================================================
 # DOE FILE STRUCTURE MAPPING
@@ -76,6 +111,18 @@ OFFENSE_MAP = {
     "LIQUOR": "Liquor",
 }
 
+# Institution descriptor columns (kept from the first file with matching rows)
+INSTITUTION_COLUMNS = ["UNITID_P", "INSTNM", "City", "State", "ZIP"]
+
+# Rows per chunk when streaming SAS files (bounds peak memory per worker)
+SAS_CHUNK_ROWS = 20000
+
+# Cell values treated as missing in yearly CSV downloads
+CSV_NULL_VALUES = ["", "NULL", "null", "NA", "N/A", "."]
+
+# Target rows per Parquet row group in the partitioned fact table
+FACT_ROW_GROUP_SIZE = 64 * 1024
+
 # File suffix patterns -> year lists
 # Files are named like: oncampuscrime212223.sas7bdat (covers 2021, 2022, 2023)
 FILE_YEAR_PATTERNS = {
@@ -92,22 +139,250 @@ FILE_YEAR_PATTERNS = {
 }
 
 
-def read_sas_file(filepath: Path) -> pd.DataFrame:
-    """Read a SAS7BDAT file and return a DataFrame."""
+def offense_display_name(offense_name: str, category: str) -> str:
+    """Get the fact-table offense label (arrest/discipline append the category)."""
+    if category in ["arrest", "discipline"]:
+        return f"{offense_name} {category.title()}"
+    return offense_name
+
+
+# =============================================================================
+# FACT TABLE SCHEMA
+# =============================================================================
+
+# Fixed label sets, so every file and partition shares one dictionary
+OFFENSE_LABELS = sorted({
+    offense_display_name(name, category)
+    for name in OFFENSE_MAP.values()
+    for category in CATEGORY_MAP
+})
+FAMILY_LABELS = sorted(CATEGORY_MAP.values())
+GEO_LABELS = sorted(GEOGRAPHY_MAP.values())
+
+# In-memory dtypes for the tidy fact table
+FACT_DTYPES = {
+    "year": "int16",
+    "unitid": "int32",
+    "offense": pd.CategoricalDtype(OFFENSE_LABELS),
+    "offense_family": pd.CategoricalDtype(FAMILY_LABELS),
+    "geo": pd.CategoricalDtype(GEO_LABELS),
+    "count": "int16",
+}
+
+# Parquet schema for the fact table (string dimensions dictionary-encoded)
+FACT_SCHEMA = pa.schema([
+    ("year", pa.int16()),
+    ("unitid", pa.int32()),
+    ("offense", pa.dictionary(pa.int8(), pa.string())),
+    ("offense_family", pa.dictionary(pa.int8(), pa.string())),
+    ("geo", pa.dictionary(pa.int8(), pa.string())),
+    ("count", pa.int16()),
+])
+
+# Hive partition columns: encoded in the directory names, not in the files
+FACT_PARTITION_COLUMNS = ["year", "offense_family"]
+FACT_FILE_SCHEMA = pa.schema([f for f in FACT_SCHEMA if f.name not in FACT_PARTITION_COLUMNS])
+
+
+def apply_fact_schema(facts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast a tidy fact frame to FACT_DTYPES.
+
+    Raises ValueError instead of silently producing NaN categories or
+    wrapped integers when a value does not fit the schema.
+    """
+    for col, dtype in FACT_DTYPES.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            unknown = set(facts[col].dropna().unique()) - set(dtype.categories)
+            if unknown:
+                raise ValueError(f"Unknown {col} labels for fact schema: {sorted(unknown)}")
+
+    if len(facts) > 0 and facts["count"].max() > np.iinfo(np.int16).max:
+        raise ValueError(f"Incident count {facts['count'].max()} does not fit in int16")
+
+    return facts[list(FACT_DTYPES)].astype(FACT_DTYPES)
+
+
+def needed_columns(years: List[int], include_institutions: bool = False) -> List[str]:
+    """
+    List the raw columns extract_offense_data needs for the given years.
+
+    Includes both UNITID variants, every OFFENSE_MAP code for each year
+    suffix, and optionally the institution descriptor columns.
+    """
+    columns = ["UNITID_P", "UNITID"]
+    columns += [f"{code}{str(year)[-2:]}" for code in OFFENSE_MAP for year in years]
+    if include_institutions:
+        columns += INSTITUTION_COLUMNS
+    return columns
+
+
+def iter_sas_chunks(
+    filepath: Path,
+    columns: Optional[List[str]] = None,
+    chunksize: int = SAS_CHUNK_ROWS,
+    raise_errors: bool = False
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a SAS7BDAT file as DataFrame chunks of at most `chunksize` rows.
+
+    Each chunk is projected to `columns` (names missing from the file are
+    ignored) as soon as it is parsed, so peak memory is bounded by one chunk
+    regardless of file size. Strings are decoded from latin1 a column at a
+    time by the parser rather than cell by cell.
+
+    Read errors are printed and end the stream early, unless `raise_errors`
+    is set (used when staging, so a truncated file is never cached).
+    """
     try:
-        from sas7bdat import SAS7BDAT
-        with SAS7BDAT(str(filepath)) as f:
-            df = f.to_data_frame()
+        reader = pd.read_sas(filepath, format="sas7bdat", encoding="latin1", chunksize=chunksize)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"  Error reading {filepath.name}: {e}")
+        return
+
+    with reader:
+        if columns is None:
+            keep = list(reader.column_names)
+        else:
+            wanted = set(columns)
+            keep = [c for c in reader.column_names if c in wanted]
+
+        try:
+            for chunk in reader:
+                yield chunk[keep]
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"  Error reading {filepath.name}: {e}")
+
+
+def iter_raw_chunks(
+    filepath: Path,
+    columns: Optional[List[str]] = None,
+    use_staging: bool = True
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a raw DOE SAS file, going through the columnar staging cache.
+
+    On first use the whole file is decoded once and staged as Arrow IPC
+    (keyed by the source sha256); every later read memory-maps the staged
+    copy and materializes only `columns`.
+
+    Read errors are raised, so a file that cannot be read is never mistaken
+    for one without data.
+    """
+    if not use_staging:
+        yield from iter_sas_chunks(filepath, columns, raise_errors=True)
+        return
+
+    staged = stage_raw_file(filepath, raise_errors=True)
+    if staged is not None:
+        yield from iter_staged_chunks(staged, columns)
+
+
+def stage_raw_file(filepath: Path, raise_errors: bool = False) -> Optional[Path]:
+    """
+    Make sure a raw DOE SAS file is in the staging cache, decoding it if needed.
+
+    Read errors are printed unless `raise_errors` is set.
+
+    Returns: the staged Arrow IPC path, or None if the file could not be read
+    """
+    staged = staged_path(filepath)
+    if not staged.exists():
+        try:
+            write_staged(iter_sas_chunks(filepath, raise_errors=True), staged)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"  Error reading {filepath.name}: {e}")
+            return None
+
+    return staged if staged.exists() else None
+
+
+def read_sas_file(filepath: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a SAS7BDAT file (optionally projected to `columns`) into one DataFrame."""
+    chunks = list(iter_sas_chunks(filepath, columns))
+    if not chunks:
         return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def find_csv_files() -> Dict[int, Path]:
+    """
+    Find yearly CSV downloads written by 01_download_raw_data.py.
+
+    Returns: {year: path} for files like data/raw/2023/Crime2023.csv
+    """
+    csv_files = {}
+    for f in sorted(RAW_DIR.glob("*/*.csv")):
+        match = re.fullmatch(r"crime(\d{4})\.csv", f.name.lower())
+        if match:
+            csv_files[int(match.group(1))] = f
+    return csv_files
+
+
+def read_csv_header(filepath: Path) -> List[str]:
+    """Read just the header row of a CSV file."""
+    with open(filepath, "r", encoding="latin1", newline="") as f:
+        return [c.strip() for c in next(csv.reader(f), [])]
+
+
+def read_csv_table(
+    filepath: Path,
+    header: List[str],
+    columns: List[str],
+    raise_errors: bool = False
+) -> Optional[pa.Table]:
+    """
+    Read a CSV file into an Arrow table with pyarrow's multithreaded parser.
+
+    Only `columns` are parsed (names missing from the header are ignored),
+    with an explicit schema: institution descriptors as strings, everything
+    else (UNITID and offense counts) as float64. Blank and NULL-like cells
+    become nulls rather than failing the conversion.
+
+    Parse errors are printed unless `raise_errors` is set.
+
+    Returns: the table, or None if the file could not be parsed
+    """
+    wanted = set(columns)
+    keep = [c for c in header if c in wanted]
+    string_cols = set(INSTITUTION_COLUMNS) - {"UNITID_P"}
+    column_types = {c: pa.string() if c in string_cols else pa.float64() for c in keep}
+
+    try:
+        return pa_csv.read_csv(
+            filepath,
+            read_options=pa_csv.ReadOptions(use_threads=True, encoding="latin1"),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=keep,
+                column_types=column_types,
+                null_values=CSV_NULL_VALUES,
+                strings_can_be_null=True,
+            ),
+        )
+    except (pa.ArrowInvalid, OSError) as e:
+        if raise_errors:
+            raise
+        print(f"  Error reading {filepath.name}: {e}")
+        return None
 
-    # Decode bytes columns
-    for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].apply(lambda x: x.decode('latin1') if isinstance(x, bytes) else x)
 
-    return df
+def iter_csv_chunks(
+    filepath: Path,
+    header: List[str],
+    columns: List[str],
+    chunksize: int = SAS_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Parse a CSV file with read_csv_table and yield it in chunks (parse errors are raised)."""
+    table = read_csv_table(filepath, header, columns, raise_errors=True)
+
+    for batch in table.to_batches(max_chunksize=chunksize):
+        yield batch.to_pandas()
 
 
 def parse_filename(filename: str) -> Optional[Tuple[str, str, List[int]]]:
@@ -133,163 +408,535 @@ def parse_filename(filename: str) -> Optional[Tuple[str, str, List[int]]]:
     return None
 
 
+def plan_files(
+    files: List[Path],
+    target_years: List[int]
+) -> List[Tuple[Path, str, str, List[int]]]:
+    """
+    Choose which DOE files to read so each (geo, category, year) is read once.
+
+    The 3-year windows overlap (151617 and 161718 both contain 2016), so for
+    each geography/category we pick a minimal set of windows covering the
+    target years: starting from the latest uncovered year, take the window
+    containing it that covers the most uncovered years (newest on ties).
+    Each year is then assigned to the newest chosen window that contains it.
+
+    Returns: [(filepath, geography, category, years_to_read), ...] in filename order
+    """
+    windows = {}
+    for f in files:
+        parsed = parse_filename(f.name)
+        if parsed:
+            geo, cat, years = parsed
+            windows.setdefault((geo, cat), []).append((years, f))
+
+    plan = []
+    for (geo, cat), candidates in windows.items():
+        # Newest window first, so max() below prefers it on ties
+        candidates.sort(key=lambda c: (max(c[0]), c[1].name), reverse=True)
+
+        uncovered = {y for years, _ in candidates for y in years if y in target_years}
+        chosen = []
+        while uncovered:
+            latest = max(uncovered)
+            best = max(
+                (c for c in candidates if latest in c[0]),
+                key=lambda c: len(uncovered.intersection(c[0]))
+            )
+            chosen.append(best)
+            uncovered -= set(best[0])
+
+        # Newest chosen window wins for every year it contains
+        assigned = {}
+        for years, f in sorted(chosen, key=lambda c: max(c[0]), reverse=True):
+            for year in years:
+                if year in target_years:
+                    assigned.setdefault(year, f)
+
+        for years, f in chosen:
+            file_years = sorted(y for y, source in assigned.items() if source == f)
+            if file_years:
+                plan.append((f, geo, cat, file_years))
+
+    return sorted(plan, key=lambda p: p[0].name)
+
+
+def find_unitid_col(df: pd.DataFrame) -> Optional[str]:
+    """Get the UNITID column - prefer _base_unitid if available (for Ivy filtering)."""
+    for col in ["_base_unitid", "UNITID_P", "UNITID"]:
+        if col in df.columns:
+            return col
+    return None
+
+
+def unpivot_counts(
+    df: pd.DataFrame,
+    unitid_col: str,
+    column_labels: Dict[str, dict]
+) -> pd.DataFrame:
+    """
+    Unpivot wide count columns to tidy rows in a single columnar pass.
+
+    `column_labels` maps each wide column to the constant fact columns it
+    represents, e.g. {"RAPE21": {"year": 2021, "offense": "Rape", ...}}.
+    Null, zero and unparseable counts are dropped; counts are truncated to int.
+    """
+    # Coerce to numeric (unparseable values become NaN and are dropped below)
+    wide = df[list(column_labels)].apply(pd.to_numeric, errors="coerce")
+    wide.insert(0, "unitid", pd.to_numeric(df[unitid_col], errors="coerce"))
+
+    # Unpivot: one row per (school, column), then skip nulls and zeros
+    long = wide.melt(id_vars="unitid", var_name="column", value_name="count")
+    long = long[long["unitid"].notna() & (long["count"] >= 1)]
+
+    labels = pd.DataFrame.from_dict(column_labels, orient="index")
+    tidy = {"year": long["column"].map(labels["year"]).astype("int64")}
+    tidy["unitid"] = long["unitid"].astype("int64")
+    for col in labels.columns.drop("year"):
+        tidy[col] = long["column"].map(labels[col])
+    tidy["count"] = long["count"].astype("int64")
+
+    return pd.DataFrame(tidy).reset_index(drop=True)
+
+
 def extract_offense_data(
     df: pd.DataFrame,
     category: str,
     years: List[int]
-) -> List[dict]:
+) -> pd.DataFrame:
     """
     Extract offense counts from DataFrame columns.
 
-    Columns are named like: RAPE21, MURD22, etc.
-    """
-    records = []
-    family = CATEGORY_MAP[category]
+    Columns are named like: RAPE21, MURD22, etc. All matching offense/year
+    columns are unpivoted to long format in a single columnar pass.
 
-    # Get the UNITID column - prefer _base_unitid if available (for Ivy filtering)
-    unitid_col = None
-    for col in ["_base_unitid", "UNITID_P", "UNITID"]:
-        if col in df.columns:
-            unitid_col = col
-            break
+    Returns: DataFrame with columns year, unitid, offense, offense_family, count
+    """
+    empty = pd.DataFrame(columns=["year", "unitid", "offense", "offense_family", "count"])
 
+    unitid_col = find_unitid_col(df)
     if unitid_col is None:
         print("  WARNING: No UNITID column found")
-        return records
+        return empty
+
+    column_labels = sas_column_labels(list(df.columns), category, years)
+    if not column_labels:
+        return empty
+
+    return unpivot_counts(df, unitid_col, column_labels)
+
+
+def sas_column_labels(columns: List[str], category: str, years: List[int]) -> Dict[str, dict]:
+    """
+    Map each wide SAS column (e.g. RAPE21) to its year, display name and family.
 
-    # Process each offense type
+    Columns not present in `columns` are skipped.
+    """
+    family = CATEGORY_MAP[category]
+    present = set(columns)
+
+    labels = {}
     for offense_code, offense_name in OFFENSE_MAP.items():
-        # For arrest/discipline, append category to offense name
-        if category in ["arrest", "discipline"]:
-            display_name = f"{offense_name} {category.title()}"
-        else:
-            display_name = offense_name
+        display_name = offense_display_name(offense_name, category)
 
-        # Look for columns matching this offense for each year
         for year in years:
-            year_suffix = str(year)[-2:]  # 2021 -> "21"
-
-            # Try different column name patterns
-            possible_cols = [
-                f"{offense_code}{year_suffix}",
-                f"{offense_code.upper()}{year_suffix}",
-            ]
-
-            col_found = None
-            for col in possible_cols:
-                if col in df.columns or col.upper() in df.columns:
-                    col_found = col if col in df.columns else col.upper()
-                    break
-
-            if col_found is None:
-                continue
-
-            # Extract values
-            for _, row in df.iterrows():
-                try:
-                    unitid = int(row[unitid_col])
-                    count = row[col_found]
-
-                    # Convert to numeric, skip nulls and zeros
-                    if pd.isna(count):
-                        continue
-                    count = int(float(count))
-                    if count <= 0:
-                        continue
-
-                    records.append({
-                        "year": year,
-                        "unitid": unitid,
-                        "offense": display_name,
-                        "offense_family": family,
-                        "count": count,
-                    })
-                except (ValueError, TypeError):
-                    continue
-
-    return records
+            col = f"{offense_code}{str(year)[-2:]}"  # 2021 -> "RAPE21"
+            if col in present:
+                labels[col] = {"year": year, "offense": display_name, "offense_family": family}
+    return labels
 
 
-def process_all_files(
-    ivy_only: bool = False,
-    target_years: Optional[List[int]] = None
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def csv_column_labels(columns: List[str]) -> Dict[str, dict]:
     """
-    Process all SAS files in the raw directory.
+    Map yearly CSV columns (OFFENSE_CODE + GEO_CODE, e.g. MURD11) to fact labels.
 
-    Returns: (facts_df, institutions_df)
+    Uses the field mapping in config. Columns outside the fact families
+    (e.g. hate crime flags) are skipped, and when several alternate field
+    names map to the same offense and geography only the first is used.
     """
-    if target_years is None:
-        target_years = list(range(2015, 2025))  # 2015-2024
+    labels = {}
+    seen = set()
+    for col in columns:
+        info = get_offense_info(col)
+        if info is None or info["family"] not in FAMILY_LABELS:
+            continue
+        key = (info["offense"], info["geo"])
+        if key in seen:
+            continue
+        seen.add(key)
+        labels[col] = {"offense": info["offense"], "offense_family": info["family"], "geo": info["geo"]}
+    return labels
 
-    all_records = []
-    all_institutions = []
 
-    # Find all SAS files
-    sas_files = list(RAW_DIR.glob("*.sas7bdat"))
-    print(f"Found {len(sas_files)} SAS files in {RAW_DIR}")
+def extract_yearly_offense_data(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    """
+    Extract offense counts from a yearly Crime{year}.csv chunk.
 
-    # Collect all files to process (not just one per geo+cat)
-    files_to_process = []
-    for f in sas_files:
-        parsed = parse_filename(f.name)
-        if parsed:
-            geo, cat, years = parsed
-            # Filter to target years
-            relevant_years = [y for y in years if y in target_years]
-            if relevant_years:
-                files_to_process.append((f, geo, cat, relevant_years))
+    Unlike the SAS files, each yearly CSV holds every geography and family
+    for a single year, with the geography encoded in the column suffix.
+
+    Returns: DataFrame with columns year, unitid, offense, offense_family, geo, count
+    """
+    empty = pd.DataFrame(columns=["year", "unitid", "offense", "offense_family", "geo", "count"])
+
+    unitid_col = find_unitid_col(df)
+    if unitid_col is None:
+        print("  WARNING: No UNITID column found")
+        return empty
 
-    print(f"Processing {len(files_to_process)} files...")
+    column_labels = {
+        col: {"year": year, **labels}
+        for col, labels in csv_column_labels(list(df.columns)).items()
+    }
+    if not column_labels:
+        return empty
 
-    for filepath, geo, category, years in tqdm(files_to_process, desc="Processing files"):
-        geo_display = GEOGRAPHY_MAP[geo]
+    return unpivot_counts(df, unitid_col, column_labels)
 
-        # Read the file
-        df = read_sas_file(filepath)
-        if df.empty:
-            continue
 
+def extract_chunks(
+    chunks: Iterator[pd.DataFrame],
+    extract: Callable[[pd.DataFrame], pd.DataFrame],
+    ivy_only: bool = False,
+    include_institutions: bool = False
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Run an extract function over a stream of raw chunks.
+
+    Applies the Ivy filter to each chunk, collects institution columns when
+    requested, and concatenates the tidy output.
+
+    Returns: (facts_df, institutions_df or None)
+    """
+    chunk_facts = []
+    chunk_institutions = []
+
+    for df in chunks:
         # Filter to Ivy League if requested
         unitid_col = "UNITID_P" if "UNITID_P" in df.columns else "UNITID"
         if ivy_only and unitid_col in df.columns:
             # UNITID_P has format like 166027001 (base + 3-digit suffix)
             # Extract base UNITID by dividing by 1000
+            df = df.copy()
             df["_base_unitid"] = (df[unitid_col].astype(float) / 1000).astype(int)
-            df = df[df["_base_unitid"].isin(IVY_UNITIDS)].copy()
+            df = df[df["_base_unitid"].isin(IVY_UNITIDS)]
 
         if df.empty:
             continue
 
-        # Extract institution info (from first file that has it)
-        if not all_institutions and unitid_col in df.columns:
-            inst_cols = [c for c in ["UNITID_P", "INSTNM", "City", "State", "ZIP"] if c in df.columns]
+        # Extract institution info
+        if include_institutions and unitid_col in df.columns:
+            inst_cols = [c for c in INSTITUTION_COLUMNS if c in df.columns]
             if inst_cols:
-                all_institutions.append(df[inst_cols].drop_duplicates())
+                chunk_institutions.append(df[inst_cols])
 
         # Extract offense data
-        records = extract_offense_data(df, category, years)
+        chunk_tidy = extract(df)
+        if not chunk_tidy.empty:
+            chunk_facts.append(chunk_tidy)
 
-        # Add geography to records
-        for rec in records:
-            rec["geo"] = geo_display
+    institutions = None
+    if chunk_institutions:
+        institutions = pd.concat(chunk_institutions, ignore_index=True).drop_duplicates()
 
-        all_records.extend(records)
+    if not chunk_facts:
+        return pd.DataFrame(), institutions
+
+    return pd.concat(chunk_facts, ignore_index=True), institutions
 
-    if not all_records:
-        raise ValueError("No data extracted from any files!")
 
-    # Create DataFrames
-    facts = pd.DataFrame(all_records)
+def process_file(
+    filepath: Path,
+    geo: str,
+    category: str,
+    years: List[int],
+    ivy_only: bool = False,
+    include_institutions: bool = False,
+    use_staging: bool = True
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Read one DOE SAS file and extract its tidy offense records.
+
+    Only the UNITID and offense columns for `years` are loaded (plus the
+    institution columns when `include_institutions` is set), and the file is
+    processed chunk by chunk so memory stays flat for large files.
 
-    # Dedupe - same offense at same school/year/geo should be summed
-    facts = facts.groupby(
-        ["year", "unitid", "offense", "offense_family", "geo"],
-        as_index=False
-    )["count"].sum()
+    Raises on read errors (see extract_source).
+
+    Returns: (facts_df, institutions_df or None)
+    """
+    columns = needed_columns(years, include_institutions)
+
+    file_facts, institutions = extract_chunks(
+        iter_raw_chunks(filepath, columns, use_staging),
+        lambda df: extract_offense_data(df, category, years),
+        ivy_only,
+        include_institutions
+    )
+    if file_facts.empty:
+        return file_facts, institutions
 
-    # Filter to target years
-    facts = facts[facts["year"].isin(target_years)]
+    # Add geography to records
+    file_facts["geo"] = GEOGRAPHY_MAP[geo]
+
+    return apply_fact_schema(file_facts), institutions
+
+
+def process_csv_file(
+    filepath: Path,
+    year: int,
+    ivy_only: bool = False,
+    include_institutions: bool = False
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Read one yearly Crime{year}.csv file and extract its tidy offense records.
+
+    Raises on read errors (see extract_source).
+
+    Returns: (facts_df, institutions_df or None)
+    """
+    header = read_csv_header(filepath)
+    columns = ["UNITID_P", "UNITID"] + list(csv_column_labels(header))
+    if include_institutions:
+        columns += INSTITUTION_COLUMNS
+
+    file_facts, institutions = extract_chunks(
+        iter_csv_chunks(filepath, header, columns),
+        lambda df: extract_yearly_offense_data(df, year),
+        ivy_only,
+        include_institutions
+    )
+    if file_facts.empty:
+        return file_facts, institutions
+
+    return apply_fact_schema(file_facts), institutions
+
+
+def extract_source(
+    filepath: Path,
+    geo: Optional[str],
+    category: Optional[str],
+    years: List[int],
+    ivy_only: bool = False,
+    include_institutions: bool = False,
+    use_staging: bool = True
+) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+    """
+    Extract one planned source file (SAS window or yearly CSV).
+
+    Runs in a worker process when process_all_files is called with workers > 1,
+    so it only depends on its arguments and module-level constants.
+
+    Returns: (facts_df, institutions_df or None), or None if the file could
+    not be read (an unreadable file is not the same as one without rows)
+    """
+    try:
+        if filepath.suffix.lower() == ".csv":
+            return process_csv_file(filepath, years[0], ivy_only, include_institutions)
+        return process_file(filepath, geo, category, years, ivy_only, include_institutions, use_staging)
+    except Exception as e:
+        print(f"  Error reading {filepath.name}: {e}")
+        return None
+
+
+def mapping_version() -> str:
+    """
+    Hash the label mappings baked into extracted partitions.
+
+    Covers the SAS filename/column maps and the config field mapping that
+    labels yearly CSV columns through get_offense_info().
+    """
+    mappings = {
+        "offense_map": OFFENSE_MAP,
+        "category_map": CATEGORY_MAP,
+        "geography_map": GEOGRAPHY_MAP,
+        "geo_codes": GEO_CODES,
+        "offense_fields": OFFENSE_FIELDS,
+        "field_name_aliases": FIELD_NAME_ALIASES,
+    }
+    encoded = json.dumps(mappings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def source_key(filepath: Path) -> str:
+    """Manifest key for a source file: its path relative to RAW_DIR."""
+    return filepath.relative_to(RAW_DIR).as_posix()
+
+
+def is_current(previous: dict, entry: dict) -> bool:
+    """Check whether a manifest entry's cached partition can be reused."""
+    keys = ["mapping_version", "years", "ivy_only", "partition", "institutions_partition"]
+    partitions = [entry["partition"], entry["institutions_partition"]]
+    return (
+        bool(previous)
+        and previous.get("fingerprint", {}).get("sha256") == entry["fingerprint"]["sha256"]
+        and all(previous.get(k) == entry[k] for k in keys)
+        and all((EXTRACT_CACHE_DIR / p).exists() for p in partitions if p)
+    )
+
+
+def plan_sources(target_years: List[int]) -> List[Tuple[Path, Optional[str], Optional[str], List[int]]]:
+    """
+    Plan the raw files to read: yearly CSVs first, then SAS windows.
+
+    A yearly data/raw/{year}/Crime{year}.csv covers every geography and
+    family for its year, so SAS windows are only planned for target years
+    without a CSV.
+
+    Returns: [(filepath, geography, category, years), ...] with geography and
+    category set to None for CSVs
+    """
+    # Find all SAS files and yearly CSVs
+    sas_files = sorted(RAW_DIR.glob("*.sas7bdat"))
+    csv_files = {y: f for y, f in find_csv_files().items() if y in target_years}
+    print(f"Found {len(sas_files)} SAS files and {len(csv_files)} yearly CSV files in {RAW_DIR}")
+
+    # Yearly CSVs take precedence; pick one authoritative SAS file per
+    # (geo, category, year) for the remaining years
+    sas_years = [y for y in target_years if y not in csv_files]
+    sources = [(f, None, None, [y]) for y, f in sorted(csv_files.items())]
+    sources += plan_files(sas_files, sas_years)
+    recognized = len(csv_files) + sum(1 for f in sas_files if parse_filename(f.name))
+    print(f"Planned {len(sources)} of {recognized} files to cover target years")
+
+    return sources
+
+
+def process_all_files(
+    ivy_only: bool = False,
+    target_years: Optional[List[int]] = None,
+    workers: int = 1,
+    use_staging: bool = True,
+    incremental: bool = True
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Process all raw DOE files (SAS windows and yearly CSVs) in the raw directory.
+
+    Each planned file's tidy records are cached as a Parquet partition under
+    data/curated/_cache/extract/, tracked by a manifest of source sha256,
+    mapping version and extraction parameters. With `incremental`, only new
+    or changed files are re-extracted and the result is rebuilt from the
+    cached partitions.
+
+    Only the files chosen by plan_sources are opened, and only the years
+    assigned to each file are extracted. Files are independent, so with
+    workers > 1 they are read and extracted in a process pool. Results are
+    merged in filename order regardless of which worker finishes first, so
+    output is identical to a sequential run.
+
+    Returns: (facts_df, institutions_df)
+    """
+    if target_years is None:
+        target_years = list(range(2015, 2025))  # 2015-2024
+
+    files_to_process = plan_sources(target_years)
+
+    # Decide which files need (re-)extraction
+    manifest = load_manifest(EXTRACT_CACHE_DIR / "manifest.json") if incremental else {}
+    version = mapping_version()
+    entries = []
+    stale = []
+    for i, (filepath, geo, category, years) in enumerate(files_to_process):
+        previous = manifest.get(source_key(filepath), {})
+        entry = {
+            "fingerprint": file_fingerprint(filepath, previous.get("fingerprint"), content_digest),
+            "mapping_version": version,
+            "years": years,
+            "ivy_only": ivy_only,
+            "partition": f"{filepath.stem}.parquet",
+            "institutions_partition": f"{filepath.stem}.institutions.parquet",
+        }
+        entries.append(entry)
+        if not is_current(previous, entry):
+            stale.append(i)
+
+    print(f"Reusing {len(files_to_process) - len(stale)} cached partitions")
+    print(f"Extracting {len(stale)} files with {workers} worker(s)...")
+
+    EXTRACT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Files that could not be read get no partition and no manifest entry,
+    # so the next run extracts them again instead of reusing an empty result
+    failed = set()
+
+    def store_result(i: int, result: Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]) -> None:
+        if result is None:
+            failed.add(i)
+            manifest.pop(source_key(files_to_process[i][0]), None)
+            return
+        file_facts, institutions = result
+        entry = entries[i]
+        file_facts.to_parquet(EXTRACT_CACHE_DIR / entry["partition"], index=False)
+        if institutions is None:
+            institutions = pd.DataFrame()
+        institutions.to_parquet(EXTRACT_CACHE_DIR / entry["institutions_partition"], index=False)
+        manifest[source_key(files_to_process[i][0])] = entry
+
+    if workers > 1 and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for i in stale:
+                filepath, geo, category, years = files_to_process[i]
+                future = executor.submit(
+                    extract_source, filepath, geo, category, years, ivy_only, True, use_staging
+                )
+                futures[future] = i
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing files"):
+                store_result(futures[future], future.result())
+    else:
+        for i in tqdm(stale, desc="Processing files"):
+            filepath, geo, category, years = files_to_process[i]
+            store_result(i, extract_source(
+                filepath, geo, category, years, ivy_only, True, use_staging
+            ))
+
+    # Forget sources that are no longer on disk
+    for name in list(manifest):
+        if not (RAW_DIR / name).exists():
+            for key in ["partition", "institutions_partition"]:
+                if manifest[name].get(key):
+                    (EXTRACT_CACHE_DIR / manifest[name][key]).unlink(missing_ok=True)
+            del manifest[name]
+
+    save_manifest(manifest, EXTRACT_CACHE_DIR / "manifest.json")
+
+    if failed:
+        print(f"WARNING: {len(failed)} file(s) could not be read and are missing from this run "
+              f"(they will be retried next run):")
+        for i in sorted(failed):
+            print(f"  {files_to_process[i][0].name}")
+
+    # Rebuild from cached partitions in file order
+    # (institution columns are kept from the first file that has any rows,
+    # e.g. the first one with an Ivy campus in Ivy mode)
+    all_facts = []
+    all_institutions = []
+    for i, entry in enumerate(entries):
+        if i in failed:
+            continue
+        file_facts = pd.read_parquet(EXTRACT_CACHE_DIR / entry["partition"])
+        if not file_facts.empty:
+            all_facts.append(file_facts)
+        if not all_institutions:
+            institutions = pd.read_parquet(EXTRACT_CACHE_DIR / entry["institutions_partition"])
+            if not institutions.empty:
+                all_institutions.append(institutions)
+
+    if not all_facts:
+        raise ValueError("No data extracted from any files!")
+
+    # Create DataFrames (categoricals share fixed dictionaries, so concat keeps them)
+    facts = apply_fact_schema(pd.concat(all_facts, ignore_index=True))
+
+    # Each (geo, category, year) comes from exactly one planned file, so keys
+    # are already unique - except in Ivy mode, where branch campuses collapse
+    # onto the same base UNITID and must be summed
+    if ivy_only:
+        facts = apply_fact_schema(facts.groupby(
+            ["year", "unitid", "offense", "offense_family", "geo"],
+            as_index=False,
+            observed=True
+        )["count"].sum())
 
     # Create institutions DataFrame
     if all_institutions:
@@ -301,15 +948,284 @@ def process_all_files(
     return facts, institutions
 
 
-def save_parquet(facts: pd.DataFrame, institutions: pd.DataFrame) -> None:
-    """Save DataFrames to Parquet files."""
+# =============================================================================
+# DUCKDB ENGINE
+# =============================================================================
+
+def sql_string(value: str) -> str:
+    """Quote a value as a SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_ident(name: str) -> str:
+    """Quote a column name as a SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def load_source_table(
+    filepath: Path,
+    category: Optional[str],
+    years: List[int],
+    include_institutions: bool = False
+) -> Tuple[Optional[pa.Table], Dict[str, dict]]:
+    """
+    Load one planned source as an Arrow table for DuckDB, with its column labels.
+
+    SAS files are read zero-copy from the memory-mapped staging cache; yearly
+    CSVs are parsed with pyarrow's multithreaded reader. Column labels carry
+    the geography for CSVs only (SAS files get it from the filename).
+
+    Returns: (table or None, {wide column: labels})
+    """
+    if filepath.suffix.lower() == ".csv":
+        try:
+            header = read_csv_header(filepath)
+        except OSError as e:
+            print(f"  Error reading {filepath.name}: {e}")
+            return None, {}
+        labels = {col: {"year": years[0], **l} for col, l in csv_column_labels(header).items()}
+        columns = ["UNITID_P", "UNITID"] + list(labels)
+        if include_institutions:
+            columns += INSTITUTION_COLUMNS
+        return read_csv_table(filepath, header, columns), labels
+
+    staged = stage_raw_file(filepath)
+    if staged is None:
+        return None, {}
+    table = read_staged_table(staged, needed_columns(years, include_institutions))
+    return table, sas_column_labels(table.schema.names, category, years)
+
+
+def source_counts_sql(source_id: int, view: str, unitid_col: str, value_cols: List[str]) -> str:
+    """
+    Build the UNPIVOT query for one registered source.
+
+    Every count column is cast to DOUBLE so they share a type (unparseable
+    values become NULL), then unpivoted to (src, unitid, column, raw_count).
+    UNPIVOT drops NULL counts on its own.
+    """
+    casts = ", ".join(f"TRY_CAST({sql_ident(c)} AS DOUBLE) AS {sql_ident(c)}" for c in value_cols)
+    on = ", ".join(sql_ident(c) for c in value_cols)
+    return f"""
+        SELECT {source_id} AS src, unitid, "column", raw_count
+        FROM (
+            UNPIVOT (
+                SELECT TRY_CAST({sql_ident(unitid_col)} AS DOUBLE) AS unitid, {casts}
+                FROM {view}
+            )
+            ON {on}
+            INTO NAME "column" VALUE raw_count
+        )"""
+
+
+def transform_with_duckdb(
+    con: duckdb.DuckDBPyConnection,
+    ivy_only: bool = False,
+    target_years: Optional[List[int]] = None,
+    workers: int = 1
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Build the fact table with DuckDB instead of pandas.
+
+    Uses the same plan as process_all_files. Every planned source is
+    registered with `con` as an Arrow table, and one SQL pipeline does the
+    unpivot, the geography/category labeling (a join against a label table),
+    the Ivy filter and the groupby on DuckDB's multithreaded executor. The
+    result is left in the `facts` table of `con` for export_partitioned_facts.
+
+    SAS files always go through the staging cache; with workers > 1, files
+    not yet staged are decoded in a process pool first.
+
+    Returns: (facts_df, institutions_df) - facts_df is only used for the summary
+    """
+    if target_years is None:
+        target_years = list(range(2015, 2025))  # 2015-2024
+
+    sources = plan_sources(target_years)
+
+    # Decode SAS files into the staging cache (the slow part) up front
+    sas_files = [filepath for filepath, geo, _, _ in sources if geo is not None]
+    if workers > 1 and len(sas_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(tqdm(executor.map(stage_raw_file, sas_files), total=len(sas_files), desc="Staging files"))
+
+    # Register sources and collect their UNPIVOT queries and column labels
+    queries = []
+    label_rows = []
+    institution_views = []
+    for i, (filepath, geo, category, years) in enumerate(tqdm(sources, desc="Registering files")):
+        table, column_labels = load_source_table(filepath, category, years, True)
+        if table is None or not column_labels:
+            continue
+
+        unitid_col = "UNITID_P" if "UNITID_P" in table.schema.names else "UNITID"
+        if unitid_col not in table.schema.names:
+            print(f"  WARNING: No UNITID column found in {filepath.name}")
+            continue
+
+        view = f"src_{i}"
+        con.register(view, table)
+        queries.append(source_counts_sql(i, view, unitid_col, list(column_labels)))
+        for col, labels in column_labels.items():
+            label_rows.append({"src": i, "column": col, "geo": GEOGRAPHY_MAP.get(geo), **labels})
+        institution_views.append(view)
+
+    if not queries:
+        raise ValueError("No data extracted from any files!")
+
+    con.register("labels", pd.DataFrame(label_rows))
+
+    # UNITID_P has format like 166027001 (base + 3-digit suffix); in Ivy mode
+    # branch campuses collapse onto the base UNITID and are summed below
+    if ivy_only:
+        unitid_expr = "CAST(trunc(r.unitid / 1000) AS BIGINT)"
+        ivy_filter = f"AND {unitid_expr} IN ({', '.join(str(u) for u in IVY_UNITIDS)})"
+    else:
+        unitid_expr = "CAST(trunc(r.unitid) AS BIGINT)"
+        ivy_filter = ""
+
+    print(f"Running DuckDB transform over {len(queries)} files...")
+    con.execute(f"""
+        CREATE OR REPLACE TABLE facts AS
+        WITH raw AS ({' UNION ALL '.join(queries)})
+        SELECT
+            CAST(l.year AS SMALLINT) AS year,
+            CAST({unitid_expr} AS INTEGER) AS unitid,
+            l.offense,
+            l.offense_family,
+            l.geo,
+            CAST(SUM(CAST(trunc(r.raw_count) AS BIGINT)) AS SMALLINT) AS count
+        FROM raw r
+        JOIN labels l ON l.src = r.src AND l."column" = r."column"
+        WHERE r.unitid IS NOT NULL AND r.raw_count >= 1 {ivy_filter}
+        GROUP BY ALL
+    """)
+
+    # Institution columns are kept from the first file that has any rows
+    # (in Ivy mode, the first one with an Ivy campus)
+    institutions = pd.DataFrame()
+    for view in institution_views:
+        names = con.execute(f"SELECT * FROM {view} LIMIT 0").df().columns
+        inst_cols = [c for c in INSTITUTION_COLUMNS if c in names]
+        if not inst_cols:
+            continue
+        where = ""
+        if ivy_only:
+            uid = sql_ident("UNITID_P" if "UNITID_P" in names else "UNITID")
+            ivy_list = ", ".join(str(u) for u in IVY_UNITIDS)
+            where = f"WHERE CAST(trunc(TRY_CAST({uid} AS DOUBLE) / 1000) AS BIGINT) IN ({ivy_list})"
+        select = ", ".join(sql_ident(c) for c in inst_cols)
+        institutions = con.execute(
+            f"SELECT DISTINCT {select} FROM {view} {where} ORDER BY ALL"
+        ).df()
+        if not institutions.empty:
+            break
+
+    facts = apply_fact_schema(con.execute("SELECT * FROM facts").df())
+    return facts, institutions
+
+
+def export_partitioned_facts(con: duckdb.DuckDBPyConnection, output_dir: Path) -> int:
+    """
+    Write the `facts` table of `con` as a Hive-partitioned dataset.
+
+    Each partition is fetched as an Arrow table and cast to FACT_FILE_SCHEMA
+    (COPY ... TO would write plain VARCHAR dimensions), so the files match
+    write_partitioned_facts: year=YYYY/offense_family=F/part-0.parquet,
+    zstd, sorted by unitid, with the partition columns only in the
+    directory names.
+
+    Returns: number of partition files written
+    """
+    partitions = con.execute(
+        "SELECT DISTINCT year, offense_family FROM facts ORDER BY ALL"
+    ).fetchall()
+
+    for year, family in partitions:
+        part_dir = output_dir / f"year={year}" / f"offense_family={family}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        result = con.execute(f"""
+            SELECT unitid, offense, geo, count
+            FROM facts
+            WHERE year = {year} AND offense_family = {sql_string(family)}
+            ORDER BY unitid, offense, geo
+        """).arrow()
+        # Newer DuckDB versions return a RecordBatchReader, older ones a Table
+        table = result.read_all() if isinstance(result, pa.RecordBatchReader) else result
+        write_fact_file(table.cast(FACT_FILE_SCHEMA), part_dir / "part-0.parquet")
+
+    return len(partitions)
+
+
+# =============================================================================
+# OUTPUT
+# =============================================================================
+
+def write_fact_file(table: pa.Table, path: Path) -> None:
+    """Write one fact partition: zstd, FACT_ROW_GROUP_SIZE row groups, with statistics."""
+    pq.write_table(
+        table,
+        path,
+        compression="zstd",
+        row_group_size=FACT_ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+
+
+def write_partitioned_facts(facts: pd.DataFrame, output_dir: Path) -> int:
+    """
+    Write facts as a Hive-partitioned dataset: year=YYYY/offense_family=F/.
+
+    Rows are sorted by unitid within each partition so row-group min/max
+    statistics let DuckDB skip row groups on unitid filters. Partition
+    columns are left out of the files (standard Hive layout), so pyarrow,
+    pandas and DuckDB all take them from the directory names and agree on
+    the dataset schema.
+
+    Returns: number of partition files written
+    """
+    written = 0
+    for (year, family), part in facts.groupby(["year", "offense_family"], sort=True, observed=True):
+        part_dir = output_dir / f"year={year}" / f"offense_family={family}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part = part.sort_values(["unitid", "offense", "geo"]).drop(columns=FACT_PARTITION_COLUMNS)
+        table = pa.Table.from_pandas(part, schema=FACT_FILE_SCHEMA, preserve_index=False)
+        write_fact_file(table, part_dir / "part-0.parquet")
+        written += 1
+    return written
+
+
+def save_parquet(
+    facts: pd.DataFrame,
+    institutions: pd.DataFrame,
+    con: Optional[duckdb.DuckDBPyConnection] = None
+) -> None:
+    """
+    Save DataFrames to Parquet files.
+
+    With `con` (DuckDB engine), the fact table is copied from its `facts`
+    table instead of being written from `facts`.
+    """
     facts_dir = CURATED_DIR / "facts"
     facts_dir.mkdir(parents=True, exist_ok=True)
 
-    # Save facts as single file (simpler)
-    facts_path = facts_dir / "incidents.parquet"
-    facts.to_parquet(facts_path, index=False)
-    print(f"Facts saved to: {facts_path}")
+    # Write the partitioned dataset next to the old one, then swap it in
+    facts_path = facts_dir / "incidents"
+    tmp_path = facts_dir / "incidents.tmp"
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    if con is not None:
+        n_files = export_partitioned_facts(con, tmp_path)
+    else:
+        n_files = write_partitioned_facts(facts, tmp_path)
+    if facts_path.exists():
+        shutil.rmtree(facts_path)
+    tmp_path.rename(facts_path)
+
+    # Remove the legacy single-file layout so it cannot be read by mistake
+    (facts_dir / "incidents.parquet").unlink(missing_ok=True)
+
+    print(f"Facts saved to: {facts_path} ({n_files} partitions)")
 
     # Save institutions dimension
     if not institutions.empty:
@@ -337,7 +1253,7 @@ def print_summary(facts: pd.DataFrame) -> None:
         print(f"  {year}: {len(year_data):,} records, {year_data['count'].sum():,} incidents")
 
     print("\nTop 10 offenses by total count:")
-    top_offenses = facts.groupby("offense")["count"].sum().nlargest(10)
+    top_offenses = facts.groupby("offense", observed=True)["count"].sum().nlargest(10)
     for offense, count in top_offenses.items():
         print(f"  {offense}: {count:,}")
 
@@ -362,6 +1278,28 @@ def main():
         action="store_true",
         help="Process all schools (overrides config)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of files to process in parallel worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--no-staging",
+        action="store_true",
+        help="Decode SAS files directly instead of using the data/raw/_staged/ cache"
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Re-extract every file, ignoring cached partitions"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["pandas", "duckdb"],
+        default="pandas",
+        help="Transform engine: pandas (incremental, cached per file) or duckdb (one SQL pipeline)"
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -385,15 +1323,34 @@ def main():
     print(f"Target years: 2015-2024")
     print(f"Processing mode: {'Ivy League only' if ivy_only else 'ALL SCHOOLS (nationwide)'}")
     print(f"Source: {RAW_DIR}")
-
-    # Process all files
-    facts, institutions = process_all_files(
-        ivy_only=ivy_only,
-        target_years=list(range(2015, 2025))
-    )
-
-    # Save to parquet
-    save_parquet(facts, institutions)
+    print(f"Workers: {args.workers}")
+    print(f"Engine: {args.engine}")
+    print(f"Staging cache: {'disabled' if args.no_staging and args.engine == 'pandas' else STAGED_DIR}")
+
+    if args.engine == "duckdb":
+        con = duckdb.connect()
+        try:
+            facts, institutions = transform_with_duckdb(
+                con,
+                ivy_only=ivy_only,
+                target_years=list(range(2015, 2025)),
+                workers=args.workers
+            )
+            save_parquet(facts, institutions, con)
+        finally:
+            con.close()
+    else:
+        # Process all files
+        facts, institutions = process_all_files(
+            ivy_only=ivy_only,
+            target_years=list(range(2015, 2025)),
+            workers=args.workers,
+            use_staging=not args.no_staging,
+            incremental=not args.full_refresh
+        )
+
+        # Save to parquet
+        save_parquet(facts, institutions)
 
     # Print summary
     print_summary(facts)
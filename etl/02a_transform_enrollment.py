@@ -13,122 +13,67 @@ Output columns:
 - enrollment_ft: Full-time enrollment
 - enrollment_pt: Part-time enrollment
 
+All nine years are built by the incremental engine in enrollment.py: each
+year is a partition under data/curated/dims/enrollment/, rebuilt only when
+its IPEDS file changed. The combined dims/dim_enrollment.parquet is
+written from the partitions for stages that read it directly.
+
 Usage:
     python 02a_transform_enrollment.py
-
-Prerequisite:
-    python 02b_transform_ef_enrollment.py (generates dim_enrollment_ef.parquet)
+    python 02a_transform_enrollment.py --force  # Rebuild every year
 """
 
 import sys
-import pandas as pd
+import argparse
 from pathlib import Path
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
-from config import PROJECT_ROOT
-
-# Directories
-IPEDS_RAW_DIR = PROJECT_ROOT / "data" / "raw" / "ipeds"
-CURATED_DIR = PROJECT_ROOT / "data" / "curated" / "dims"
-
-# Years with DRVEF files available
-DRVEF_YEARS = [2021, 2022, 2023]
-
-
-def load_drvef_file(year: int) -> pd.DataFrame:
-    """Load and parse a DRVEF file for a given year."""
-    file_path = IPEDS_RAW_DIR / str(year) / f"drvef{year}.csv"
-
-    if not file_path.exists():
-        print(f"  Warning: {file_path.name} not found")
-        return pd.DataFrame()
-
-    # Read only the columns we need
-    cols = ['UNITID', 'ENRTOT', 'FTE', 'ENRFT', 'ENRPT']
-    df = pd.read_csv(file_path, usecols=cols)
-
-    # Add year column
-    df['year'] = year
-
-    # Clean up: remove rows with missing FTE
-    df = df.dropna(subset=['FTE'])
-
-    # Convert to appropriate types
-    df['UNITID'] = df['UNITID'].astype('int32')
-    df['year'] = df['year'].astype('int16')
-    df['FTE'] = df['FTE'].astype('int32')
-    df['ENRTOT'] = df['ENRTOT'].fillna(0).astype('int32')
-    df['ENRFT'] = df['ENRFT'].fillna(0).astype('int32')
-    df['ENRPT'] = df['ENRPT'].fillna(0).astype('int32')
-
-    return df
-
-
-def load_ef_data() -> pd.DataFrame:
-    """Load EF-derived enrollment data for 2015-2020 from parquet file."""
-    ef_path = CURATED_DIR / "dim_enrollment_ef.parquet"
-
-    if not ef_path.exists():
-        print(f"  Warning: {ef_path.name} not found")
-        print("  Run: python 02b_transform_ef_enrollment.py first")
-        return pd.DataFrame()
-
-    df = pd.read_parquet(ef_path)
-    return df
+from config import CURATED_DIR
+from enrollment import DRVEF_YEARS, EF_YEARS, ENROLLMENT_YEARS, build_enrollment, read_enrollment
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Build the enrollment dimension from IPEDS DRVEF and EF files"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every year even if its source file is unchanged"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of years to build concurrently (default: 4)"
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("IPEDS Enrollment Transform (Combined)")
     print("=" * 60)
     print("Sources:")
-    print("  - DRVEF files (2021-2023): Pre-calculated FTE")
-    print("  - EF files (2015-2020): Calculated FTE")
-
-    all_data = []
-
-    # Load DRVEF files (2021-2023)
-    print("\n--- DRVEF Data (2021-2023) ---")
-    for year in DRVEF_YEARS:
-        print(f"\n{year}:")
-        df = load_drvef_file(year)
-        if len(df) > 0:
-            # Rename columns to match schema
-            df = df.rename(columns={
-                'UNITID': 'unitid',
-                'FTE': 'fte',
-                'ENRTOT': 'enrollment_total',
-                'ENRFT': 'enrollment_ft',
-                'ENRPT': 'enrollment_pt'
-            })
-            print(f"  Loaded {len(df):,} institutions")
-            all_data.append(df)
-        else:
-            print(f"  No data")
-
-    # Load EF-derived data (2015-2020)
-    print("\n--- EF Data (2015-2020) ---")
-    ef_data = load_ef_data()
-    if len(ef_data) > 0:
-        print(f"  Loaded {len(ef_data):,} records from {ef_data['year'].nunique()} years")
-        all_data.append(ef_data)
-    else:
-        print("  Warning: No EF data loaded - historical FTE will be missing")
-
-    if not all_data:
+    print(f"  - DRVEF files ({min(DRVEF_YEARS)}-{max(DRVEF_YEARS)}): Pre-calculated FTE")
+    print(f"  - EF files ({min(EF_YEARS)}-{max(EF_YEARS)}): Calculated FTE")
+
+    print("\n--- Building year partitions ---")
+    statuses = build_enrollment(ENROLLMENT_YEARS, args.workers, args.force)
+    unchanged = [year for year, status in statuses.items() if status == "unchanged"]
+    kept = [year for year, status in statuses.items() if status == "kept"]
+    missing = [year for year, status in statuses.items() if status == "missing"]
+    if unchanged:
+        print(f"  Unchanged: {', '.join(map(str, unchanged))}")
+    if kept:
+        print(f"  Source file missing, kept previous build: {', '.join(map(str, kept))}")
+    if missing:
+        print(f"  Warning: No data for {', '.join(map(str, missing))} - FTE will be missing")
+
+    combined = read_enrollment()
+    if combined is None:
         print("\nError: No enrollment data found!")
         return 1
 
-    # Combine all years
-    combined = pd.concat(all_data, ignore_index=True)
-
-    # Ensure correct column order
-    combined = combined[['unitid', 'year', 'fte', 'enrollment_total', 'enrollment_ft', 'enrollment_pt']]
-
-    # Sort by unitid and year
-    combined = combined.sort_values(['unitid', 'year']).reset_index(drop=True)
-
     print("\n" + "=" * 60)
     print("Summary")
     print("=" * 60)
@@ -150,8 +95,9 @@ def main():
         print(yale.to_string(index=False))
 
     # Save to parquet
-    CURATED_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = CURATED_DIR / "dim_enrollment.parquet"
+    output_dir = CURATED_DIR / "dims"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / "dim_enrollment.parquet"
     combined.to_parquet(output_path, index=False)
 
     print(f"\nSaved to: {output_path}")
@@ -2,7 +2,9 @@
 Build dimension tables for institutions and offenses.
 
 This script creates dimension tables that enrich the fact data:
-- dim_institution: School metadata with Ivy League flags
+- dim_institution: School metadata with Ivy League flags, enriched with
+  sector, coordinates and Carnegie class from the IPEDS HD directory files
+  downloaded by 01b_download_ipeds.py
 - dim_offense: Offense metadata with descriptions and ordering
 
 Usage:
@@ -10,23 +12,83 @@ Usage:
 """
 
 import sys
+import numpy as np
 import pandas as pd
-import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
 from pathlib import Path
+from typing import List, Optional
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
 from config import (
-    CURATED_DIR, IVY_LEAGUE, IVY_BASE_UNITIDS, OFFENSE_ORDER, OFFENSE_ORDER_MAP,
-    OFFENSE_DESCRIPTIONS, OFFENSE_FAMILIES, US_STATES, VALID_STATE_CODES,
-    PROCESS_ALL_SCHOOLS
+    RAW_DIR, CURATED_DIR, IVY_LEAGUE, IVY_BASE_UNITIDS, OFFENSE_ORDER, OFFENSE_ORDER_MAP,
+    OFFENSE_DESCRIPTIONS, OFFENSE_FAMILIES, US_STATES, VALID_STATE_CODES, IPEDS_SECTORS,
+    DATA_YEARS, PROCESS_ALL_SCHOOLS
 )
+from ipeds import read_member_table
+from warehouse import Warehouse
 
+IPEDS_RAW_DIR = RAW_DIR / "ipeds"
 
-def build_dim_institution() -> pd.DataFrame:
+# HD columns read for the dimension; the Carnegie column is named after the
+# classification edition, so every declared edition is read (newest first)
+HD_READ_COLUMNS = ["UNITID", "INSTNM", "CITY", "STABBR", "SECTOR", "LATITUDE", "LONGITUD"]
+CARNEGIE_COLUMNS = ["C21BASIC", "C18BASIC", "C15BASIC"]
+
+# Columns load_hd_directory() contributes to the dimension
+HD_DIM_COLUMNS = ["institution_name", "city", "state", "sector", "carnegie_basic", "latitude", "longitude", "hd_year"]
+
+
+def load_hd_directory(years: List[int] = DATA_YEARS) -> Optional[pd.DataFrame]:
+    """
+    Load the most recent IPEDS HD directory record of every institution.
+
+    Reads hd{year} for each downloaded year and keeps, per UNITID, the row
+    from the latest year it appears in (closed institutions drop out of
+    newer directories). Carnegie class is the newest edition present;
+    IPEDS "not applicable" codes (negative) become null.
+
+    Returns: DataFrame keyed by base unitid, or None if no HD file exists
+    """
+    tables = []
+    for year in years:
+        table = read_member_table(IPEDS_RAW_DIR / str(year), f"hd{year}", HD_READ_COLUMNS + CARNEGIE_COLUMNS)
+        if table is None:
+            continue
+        carnegie = pc.coalesce(*[table[col] for col in CARNEGIE_COLUMNS])
+        tables.append(pa.table({
+            "base_unitid": table["UNITID"],
+            "institution_name": table["INSTNM"],
+            "city": table["CITY"],
+            "state": table["STABBR"],
+            "sector_code": table["SECTOR"],
+            "carnegie_basic": pc.if_else(pc.greater(carnegie, 0), carnegie, None),
+            "latitude": table["LATITUDE"],
+            "longitude": table["LONGITUD"],
+            "hd_year": pa.array(np.full(table.num_rows, year, dtype=np.int16)),
+        }))
+
+    if not tables:
+        return None
+
+    hd = pa.concat_tables(tables).to_pandas(types_mapper={pa.int16(): pd.Int16Dtype()}.get)
+    hd = hd.dropna(subset=["base_unitid"])
+    hd = hd.sort_values("hd_year", ascending=False, kind="stable").drop_duplicates("base_unitid")
+    hd["base_unitid"] = hd["base_unitid"].astype("int64")
+    return hd.reset_index(drop=True)
+
+
+def build_dim_institution(warehouse: Warehouse) -> pd.DataFrame:
     """
     Create institution dimension with Ivy League flags.
 
+    Name, city and state come from the Ivy League config, then the latest
+    HD directory record for main campuses, then the crime files' campus
+    rows, then HD for branch campuses (HD describes the institution, which
+    is where its main campus is). Institution-level attributes come from
+    HD, joined once on base_unitid.
+
     Schema:
         unitid: int32                # Primary key
         institution_name: string     # Full name
@@ -34,28 +96,22 @@ def build_dim_institution() -> pd.DataFrame:
         city: string
         state: string (2-char)
         ivy_league: boolean
-        sector: string               # Optional, from raw data
+        sector: string               # IPEDS sector, from HD (else raw data)
+        carnegie_basic: int16        # Carnegie basic classification code (HD)
+        latitude: float64            # Main campuses only (HD)
+        longitude: float64           # Main campuses only (HD)
+        hd_year: int16               # HD directory year the attributes came from
     """
     print("Building institution dimension...")
 
     dims_dir = CURATED_DIR / "dims"
     dims_dir.mkdir(parents=True, exist_ok=True)
 
-    con = duckdb.connect()
-
     # Get unique UNITIDs from facts
-    facts_path = CURATED_DIR / "facts"
-
-    # Check for partitioned or single file
-    if (facts_path / "incidents").exists():
-        facts_pattern = str(facts_path / "incidents" / "**" / "*.parquet")
-    else:
-        facts_pattern = str(facts_path / "*.parquet")
-
     try:
-        unitids_df = con.execute(f"""
+        unitids_df = warehouse.execute(f"""
             SELECT DISTINCT unitid
-            FROM read_parquet('{facts_pattern}')
+            FROM {warehouse.source("facts")}
             ORDER BY unitid
         """).df()
     except Exception as e:
@@ -73,72 +129,76 @@ def build_dim_institution() -> pd.DataFrame:
         raw_inst.columns = raw_inst.columns.str.upper()
         print(f"  Loaded raw institution data: {len(raw_inst)} rows")
 
-    # Build dimension
-    records = []
-
-    for unitid in unitids_df["unitid"]:
-        # Check if this is an Ivy League school (by base unitid)
-        base_unitid = int(unitid) // 1000
-        is_ivy = base_unitid in IVY_BASE_UNITIDS
-
-        # Determine campus type based on UNITID suffix
-        # Main campuses typically end in 001, branches have other suffixes
-        branch_suffix = int(unitid) % 1000
-        is_main_campus = (branch_suffix == 1)
-
-        record = {
-            "unitid": int(unitid),
-            "base_unitid": base_unitid,
-            "is_main_campus": is_main_campus,
-            "institution_name": None,
-            "short_name": None,
-            "city": None,
-            "state": None,
-            "ivy_league": is_ivy,
-            "sector": None,
-        }
-
-        # Add Ivy League info (use main campus info for all branches)
-        if is_ivy:
-            # Find the main campus unitid (base * 1000 + 1)
-            main_campus_uid = base_unitid * 1000 + 1
-            if main_campus_uid in IVY_LEAGUE:
-                ivy_info = IVY_LEAGUE[main_campus_uid]
-                record["institution_name"] = ivy_info["name"]
-                record["short_name"] = ivy_info["short"]
-                record["city"] = ivy_info["city"]
-                record["state"] = ivy_info["state"]
-
-        # Try to get info from raw institutions
-        # Check various possible column names for UNITID
-        unitid_col = None
-        for col in ["UNITID", "UNITID_P"]:
-            if raw_inst is not None and col in raw_inst.columns:
-                unitid_col = col
-                break
-
-        if raw_inst is not None and unitid_col:
-            # Match unitid directly (UNITID_P is same format, just float)
-            row = raw_inst[raw_inst[unitid_col].astype(int) == unitid]
-
-            if len(row) > 0:
-                row = row.iloc[0]
-                if record["institution_name"] is None and "INSTNM" in row.index:
-                    record["institution_name"] = row.get("INSTNM")
-                if record["city"] is None and "CITY" in row.index:
-                    record["city"] = row.get("CITY")
-                # Check for STATE or STABBR column
-                if record["state"] is None:
-                    if "STATE" in row.index:
-                        record["state"] = row.get("STATE")
-                    elif "STABBR" in row.index:
-                        record["state"] = row.get("STABBR")
-                if "SECTOR_DESC" in row.index:
-                    record["sector"] = row.get("SECTOR_DESC")
-
-        records.append(record)
+    # Build dimension: flags from the unitid itself
+    dim_institution = unitids_df[["unitid"]].astype("int64")
+    dim_institution["base_unitid"] = dim_institution["unitid"] // 1000
+    # Main campuses typically end in 001, branches have other suffixes
+    dim_institution["is_main_campus"] = dim_institution["unitid"] % 1000 == 1
+    # Ivy League schools are matched by base unitid (any branch)
+    dim_institution["ivy_league"] = dim_institution["base_unitid"].isin(IVY_BASE_UNITIDS)
+
+    # Ivy League info (use main campus info for all branches)
+    ivy_info = (
+        pd.DataFrame.from_dict(IVY_LEAGUE, orient="index")
+        .reindex(dim_institution["base_unitid"] * 1000 + 1)
+        .set_index(dim_institution.index)
+    )
 
-    dim_institution = pd.DataFrame(records)
+    # Raw institution info, joined once on unitid (first row per unitid)
+    raw_info = pd.DataFrame(index=dim_institution.index)
+    unitid_col = None
+    for col in ["UNITID", "UNITID_P"]:
+        if raw_inst is not None and col in raw_inst.columns:
+            unitid_col = col
+            break
+
+    if unitid_col:
+        # Check for STATE or STABBR column
+        state_col = "STATE" if "STATE" in raw_inst.columns else "STABBR"
+        raw_columns = {"INSTNM": "institution_name", "CITY": "city", state_col: "state", "SECTOR_DESC": "sector"}
+        raw_columns = {col: name for col, name in raw_columns.items() if col in raw_inst.columns}
+
+        # Match unitid directly (UNITID_P is same format, just float)
+        raw = raw_inst[list(raw_columns)].rename(columns=raw_columns)
+        raw["unitid"] = raw_inst[unitid_col].astype("int64")
+        raw = raw.drop_duplicates("unitid")
+        raw_info = dim_institution[["unitid"]].merge(raw, on="unitid", how="left").set_index(dim_institution.index)
+
+    # Latest HD directory record, joined once on base_unitid
+    hd_info = pd.DataFrame(index=dim_institution.index, columns=HD_DIM_COLUMNS)
+    hd = load_hd_directory()
+    if hd is not None:
+        print(f"  Loaded HD directory: {len(hd)} institutions "
+              f"({hd['hd_year'].min()}-{hd['hd_year'].max()})")
+        hd["sector"] = hd["sector_code"].map(IPEDS_SECTORS)
+        hd_info = dim_institution[["base_unitid"]].merge(hd, on="base_unitid", how="left").set_index(dim_institution.index)
+    hd_main = hd_info.where(dim_institution["is_main_campus"], axis=0)
+
+    def column(*sources) -> pd.Series:
+        """First non-null value across (frame, column) sources, else None."""
+        values = pd.Series(None, index=dim_institution.index, dtype=object)
+        for frame, col in reversed(sources):
+            if col in frame.columns:
+                values = frame[col].astype(object).combine_first(values)
+        return values.where(values.notna(), None)
+
+    dim_institution["institution_name"] = column(
+        (ivy_info, "name"), (hd_main, "institution_name"), (raw_info, "institution_name"), (hd_info, "institution_name")
+    )
+    dim_institution["short_name"] = column((ivy_info, "short"))
+    dim_institution["city"] = column((ivy_info, "city"), (hd_main, "city"), (raw_info, "city"), (hd_info, "city"))
+    dim_institution["state"] = column((ivy_info, "state"), (hd_main, "state"), (raw_info, "state"), (hd_info, "state"))
+    dim_institution["sector"] = column((hd_info, "sector"), (raw_info, "sector"))
+    dim_institution = dim_institution[[
+        "unitid", "base_unitid", "is_main_campus", "institution_name", "short_name",
+        "city", "state", "ivy_league", "sector",
+    ]].infer_objects()
+
+    # Institution-level HD attributes (coordinates are the main campus's)
+    dim_institution["carnegie_basic"] = hd_info["carnegie_basic"].astype("Int16")
+    dim_institution["latitude"] = hd_main["latitude"].astype("float64")
+    dim_institution["longitude"] = hd_main["longitude"].astype("float64")
+    dim_institution["hd_year"] = hd_info["hd_year"].astype("Int16")
 
     # Add state_name column from config
     dim_institution["state_name"] = dim_institution["state"].map(
@@ -161,12 +221,14 @@ def build_dim_institution() -> pd.DataFrame:
     branch_count = len(dim_institution) - main_count
     states_with_data = dim_institution["state"].dropna().nunique()
     missing_names = dim_institution["institution_name"].isna().sum()
+    hd_matched = dim_institution["hd_year"].notna().sum()
 
     print(f"  Total institutions: {len(dim_institution)}")
     print(f"  Main campuses: {main_count}")
     print(f"  Branch campuses: {branch_count}")
     print(f"  Ivy League: {ivy_count}")
     print(f"  States with data: {states_with_data}")
+    print(f"  Matched to HD directory: {hd_matched}")
     if missing_names > 0:
         print(f"  WARNING: {missing_names} institutions missing names")
 
@@ -183,7 +245,7 @@ def build_dim_institution() -> pd.DataFrame:
     return dim_institution
 
 
-def build_dim_offense() -> pd.DataFrame:
+def build_dim_offense(warehouse: Warehouse) -> pd.DataFrame:
     """
     Create offense dimension with metadata.
 
@@ -201,22 +263,13 @@ def build_dim_offense() -> pd.DataFrame:
     dims_dir = CURATED_DIR / "dims"
     dims_dir.mkdir(parents=True, exist_ok=True)
 
-    con = duckdb.connect()
-
     # Get unique offenses from facts
-    facts_path = CURATED_DIR / "facts"
-
-    if (facts_path / "incidents").exists():
-        facts_pattern = str(facts_path / "incidents" / "**" / "*.parquet")
-    else:
-        facts_pattern = str(facts_path / "*.parquet")
-
     try:
-        offenses_df = con.execute(f"""
+        offenses_df = warehouse.execute(f"""
             SELECT DISTINCT
                 offense,
                 offense_family
-            FROM read_parquet('{facts_pattern}')
+            FROM {warehouse.source("facts")}
             ORDER BY offense
         """).df()
         offenses_df["definition_version"] = "post_2015"
@@ -280,8 +333,9 @@ def main():
     print("Building Dimension Tables")
     print("=" * 60)
 
-    dim_institution = build_dim_institution()
-    dim_offense = build_dim_offense()
+    with Warehouse() as warehouse:
+        dim_institution = build_dim_institution(warehouse)
+        dim_offense = build_dim_offense(warehouse)
 
     print("\n" + "=" * 60)
     print("Summary")
@@ -13,40 +13,33 @@ Usage:
 import sys
 import argparse
 import pandas as pd
-import duckdb
 from pathlib import Path
+from typing import List
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
 from config import CURATED_DIR, IVY_LEAGUE, GEO_FOR_ALL, US_STATES, PROCESS_ALL_SCHOOLS
-
-
-def get_facts_pattern() -> str:
-    """Get the glob pattern for reading fact files."""
-    facts_path = CURATED_DIR / "facts"
-
-    if (facts_path / "incidents").exists():
-        return str(facts_path / "incidents" / "**" / "*.parquet")
-    else:
-        return str(facts_path / "*.parquet")
+from enrollment import read_enrollment
+from warehouse import Warehouse
 
 
 def load_enrollment_data() -> pd.DataFrame:
     """
     Load enrollment data with FTE for rate calculations.
     Returns DataFrame with unitid, year, fte columns.
+
+    Reads the per-year partitions built by 02a (see enrollment.py).
     """
-    enrollment_path = CURATED_DIR / "dims" / "dim_enrollment.parquet"
-    if not enrollment_path.exists():
+    # Only need unitid, year, fte for joining
+    df = read_enrollment(["unitid", "year", "fte"])
+    if df is None:
         print("  WARNING: Enrollment data not found. Rates will not be calculated.")
         return None
 
-    df = pd.read_parquet(enrollment_path)
-    # Only need unitid, year, fte for joining
-    return df[["unitid", "year", "fte"]]
+    return df
 
 
-def create_school_year_offense_agg(ivy_only: bool = False) -> pd.DataFrame:
+def create_school_year_offense_agg(warehouse: Warehouse, ivy_only: bool = False) -> pd.DataFrame:
     """
     Aggregate: (year, unitid, offense, geo) -> count
 
@@ -66,80 +59,84 @@ def create_school_year_offense_agg(ivy_only: bool = False) -> pd.DataFrame:
     """
     print("Creating school-year-offense aggregate...")
 
-    con = duckdb.connect()
-    facts_pattern = get_facts_pattern()
+    # Institution names from dimension, else Ivy League names from config
+    dims_path = CURATED_DIR / "dims" / "dim_institution.parquet"
+    if dims_path.exists():
+        names = f"(SELECT unitid, institution_name FROM {warehouse.source('dim_institution')})"
+    else:
+        warehouse.con.register("ivy_names", pd.DataFrame({
+            "unitid": list(IVY_LEAGUE.keys()),
+            "institution_name": [info["name"] for info in IVY_LEAGUE.values()],
+        }))
+        names = "ivy_names"
 
-    # Base aggregation query
-    query = f"""
-    SELECT
-        f.year,
-        f.unitid,
-        f.offense,
-        f.offense_family,
-        f.geo,
-        SUM(f.count) as count
-    FROM read_parquet('{facts_pattern}') f
-    """
+    # Enrollment for FTE and rate calculations
+    # Note: Crime data uses extended UNITID format (UNITID * 1000 + branch)
+    # IPEDS uses base UNITID, so we join on the base UNITID
+    enrollment = load_enrollment_data()
+    if enrollment is not None:
+        print(f"  Joining enrollment data ({len(enrollment):,} records)...")
+        warehouse.con.register("enrollment", enrollment)
+    else:
+        warehouse.con.register("enrollment", pd.DataFrame({
+            "unitid": pd.Series(dtype="int32"), "year": pd.Series(dtype="int16"), "fte": pd.Series(dtype="int32"),
+        }))
 
+    where = ""
     if ivy_only:
         ivy_list = ", ".join(str(u) for u in IVY_LEAGUE.keys())
-        query += f" WHERE f.unitid IN ({ivy_list})"
+        where = f"WHERE f.unitid IN ({ivy_list})"
+    geo_for_all = ", ".join(f"'{geo}'" for geo in GEO_FOR_ALL)
 
-    query += """
-    GROUP BY f.year, f.unitid, f.offense, f.offense_family, f.geo
-    ORDER BY f.year, f.unitid, f.offense, f.geo
+    # One pass over the facts: per-geo rows, plus an "All" geography that
+    # sums On-campus + Non-campus + Public property (not Residence halls).
+    # As before, schools without an institution_name get no "All" rows.
+    # The rate rounds half to even, like pandas' round(2).
+    query = f"""
+    WITH grouped AS (
+        SELECT
+            f.year,
+            f.unitid,
+            f.offense,
+            f.offense_family,
+            CASE WHEN GROUPING(f.geo) = 1 THEN 'All' ELSE f.geo END AS geo,
+            CASE WHEN GROUPING(f.geo) = 1
+                THEN SUM(CASE WHEN f.geo IN ({geo_for_all}) THEN f.count END)
+                ELSE SUM(f.count)
+            END AS count
+        FROM {warehouse.source("facts")} f
+        {where}
+        GROUP BY GROUPING SETS (
+            (f.year, f.unitid, f.offense, f.offense_family, f.geo),
+            (f.year, f.unitid, f.offense, f.offense_family)
+        )
+    )
+    SELECT
+        g.year::SMALLINT AS year,
+        g.unitid::INTEGER AS unitid,
+        g.offense,
+        g.offense_family,
+        g.geo,
+        g.count::INTEGER AS count,
+        n.institution_name,
+        e.fte,
+        CASE WHEN e.fte <> 0
+            THEN round_even(g.count / e.fte * 10000 * 100, 0) / 100
+        END AS rate_per_10k
+    FROM grouped g
+    LEFT JOIN {names} n ON n.unitid = g.unitid
+    LEFT JOIN enrollment e ON e.unitid = g.unitid // 1000 AND e.year = g.year
+    WHERE g.count IS NOT NULL AND (g.geo <> 'All' OR n.institution_name IS NOT NULL)
+    ORDER BY g.year, g.unitid, g.offense, g.geo
     """
 
-    agg = con.execute(query).df()
-    print(f"  Base aggregation: {len(agg):,} records")
+    # Fetched through Arrow, so strings are never materialized as Python objects
+    agg = warehouse.fetch_arrow(query).to_pandas()
+    print(f"  Base aggregation: {(agg['geo'] != 'All').sum():,} records")
 
-    # Add institution names from dimension
-    dims_path = CURATED_DIR / "dims" / "dim_institution.parquet"
-    if dims_path.exists():
-        dim_inst = pd.read_parquet(dims_path)
-        name_map = dim_inst.set_index("unitid")["institution_name"].to_dict()
-        agg["institution_name"] = agg["unitid"].map(name_map)
-    else:
-        # Use Ivy League names from config
-        name_map = {uid: info["name"] for uid, info in IVY_LEAGUE.items()}
-        agg["institution_name"] = agg["unitid"].map(name_map)
-
-    # Create "All" geography aggregation
-    # Sum On-campus + Non-campus + Public property (not Residence halls)
-    geo_filter = agg["geo"].isin(GEO_FOR_ALL)
-    all_geo = agg[geo_filter].copy()
-    all_geo["geo"] = "All"
-
-    all_geo_agg = all_geo.groupby(
-        ["year", "unitid", "institution_name", "offense", "offense_family", "geo"],
-        as_index=False
-    )["count"].sum()
-
-    # Combine with original
-    agg = pd.concat([agg, all_geo_agg], ignore_index=True)
-
-    # Join enrollment data for FTE and rate calculations
-    # Note: Crime data uses extended UNITID format (UNITID * 1000 + branch)
-    # IPEDS uses base UNITID, so we need to extract base UNITID for joining
-    enrollment = load_enrollment_data()
     if enrollment is not None:
-        print(f"  Joining enrollment data ({len(enrollment):,} records)...")
-        # Extract base UNITID from extended format
-        agg["base_unitid"] = (agg["unitid"] // 1000).astype("int32")
-        # Join on base_unitid and year
-        agg = agg.merge(enrollment, left_on=["base_unitid", "year"], right_on=["unitid", "year"], how="left", suffixes=("", "_enroll"))
-        # Drop the duplicate unitid column from enrollment
-        agg = agg.drop(columns=["unitid_enroll"], errors="ignore")
-        agg = agg.drop(columns=["base_unitid"])
-        # Calculate rate per 10,000 FTE students
-        agg["rate_per_10k"] = (agg["count"] / agg["fte"] * 10000).round(2)
-        # Handle division by zero or missing FTE
-        agg.loc[agg["fte"].isna() | (agg["fte"] == 0), "rate_per_10k"] = None
         matched = agg["fte"].notna().sum()
         print(f"  Matched enrollment: {matched:,} / {len(agg):,} records ({matched/len(agg)*100:.1f}%)")
-    else:
-        agg["fte"] = None
-        agg["rate_per_10k"] = None
 
     # Ensure proper types
     agg["year"] = agg["year"].astype("int16")
@@ -148,9 +145,6 @@ def create_school_year_offense_agg(ivy_only: bool = False) -> pd.DataFrame:
     # FTE may have nulls, so use nullable int
     agg["fte"] = agg["fte"].astype("Int32")
 
-    # Sort
-    agg = agg.sort_values(["year", "unitid", "offense", "geo"]).reset_index(drop=True)
-
     print(f"  With 'All' geography: {len(agg):,} records")
 
     # Save
@@ -165,6 +159,39 @@ def create_school_year_offense_agg(ivy_only: bool = False) -> pd.DataFrame:
     return agg
 
 
+def rank_schools(data: pd.DataFrame, keys: List[str], pct_column: str, columns: List[str]) -> pd.DataFrame:
+    """
+    Rank schools within each `keys` group (e.g. year, offense, geo).
+
+    Vectorized over all groups at once:
+        rank: by count descending
+        rank_by_rate: by rate_per_10k descending (schools with FTE only)
+        pct_column: school's percent of the group's total count
+    Both ranks break ties on institution_name, then unitid.
+
+    Returns: `columns` of the ranked rows, sorted by group and rank
+    """
+    order = [True] * len(keys)
+    ranked = data.sort_values(
+        keys + ["count", "institution_name", "unitid"],
+        ascending=order + [False, True, True],
+        kind="stable"
+    )
+    ranked["rank"] = ranked.groupby(keys, sort=False, observed=True).cumcount() + 1
+
+    with_rate = ranked[ranked["rate_per_10k"].notna()].sort_values(
+        keys + ["rate_per_10k", "institution_name", "unitid"],
+        ascending=order + [False, True, True],
+        kind="stable"
+    )
+    ranked["rank_by_rate"] = with_rate.groupby(keys, sort=False, observed=True).cumcount() + 1
+
+    total_count = ranked.groupby(keys, sort=False, observed=True)["count"].transform("sum")
+    ranked[pct_column] = (ranked["count"] / total_count * 100).where(total_count > 0, 0).round(2)
+
+    return ranked[columns].reset_index(drop=True)
+
+
 def create_ivy_rankings(school_agg: pd.DataFrame = None) -> pd.DataFrame:
     """
     Pre-compute Ivy League rankings for all year/offense/geo combinations.
@@ -209,52 +236,10 @@ def create_ivy_rankings(school_agg: pd.DataFrame = None) -> pd.DataFrame:
     ivy_data["short_name"] = ivy_data["unitid"].map(short_map)
 
     # Calculate rankings within each (year, offense, geo) group
-    rankings = []
-
-    groups = ivy_data.groupby(["year", "offense", "geo"])
-
-    for (year, offense, geo), group in groups:
-        # Sort by count descending, then by name for deterministic tie-breaking
-        sorted_group = group.sort_values(
-            ["count", "institution_name"],
-            ascending=[False, True]
-        ).reset_index(drop=True)
-
-        # Calculate total for percentage
-        total_count = sorted_group["count"].sum()
-
-        # Create rank by rate (only for schools with FTE data)
-        # Sort by rate descending, then by name for deterministic tie-breaking
-        rate_ranks = {}
-        schools_with_rate = sorted_group[sorted_group["rate_per_10k"].notna()].copy() if "rate_per_10k" in sorted_group.columns else pd.DataFrame()
-        if len(schools_with_rate) > 0:
-            schools_with_rate = schools_with_rate.sort_values(
-                ["rate_per_10k", "institution_name"],
-                ascending=[False, True]
-            )
-            for rate_rank, (_, rate_row) in enumerate(schools_with_rate.iterrows(), 1):
-                rate_ranks[rate_row["unitid"]] = rate_rank
-
-        for rank, (_, row) in enumerate(sorted_group.iterrows(), 1):
-            pct = (row["count"] / total_count * 100) if total_count > 0 else 0
-
-            rankings.append({
-                "year": year,
-                "offense": offense,
-                "offense_family": row["offense_family"],
-                "geo": geo,
-                "rank": rank,
-                "rank_by_rate": rate_ranks.get(row["unitid"]),
-                "unitid": row["unitid"],
-                "institution_name": row["institution_name"],
-                "short_name": row["short_name"],
-                "count": row["count"],
-                "pct_of_ivy_total": round(pct, 2),
-                "fte": row.get("fte") if pd.notna(row.get("fte")) else None,
-                "rate_per_10k": row.get("rate_per_10k") if pd.notna(row.get("rate_per_10k")) else None,
-            })
-
-    rankings_df = pd.DataFrame(rankings)
+    rankings_df = rank_schools(ivy_data, ["year", "offense", "geo"], "pct_of_ivy_total", [
+        "year", "offense", "offense_family", "geo", "rank", "rank_by_rate", "unitid",
+        "institution_name", "short_name", "count", "pct_of_ivy_total", "fte", "rate_per_10k",
+    ])
 
     # Ensure proper types
     rankings_df["year"] = rankings_df["year"].astype("int16")
@@ -359,57 +344,10 @@ def create_state_rankings(school_agg: pd.DataFrame = None) -> pd.DataFrame:
     valid_data["short_name"] = valid_data["unitid"].map(short_map)
 
     # Calculate rankings within each (state, year, offense, geo) group
-    rankings = []
-
-    groups = valid_data.groupby(["state", "year", "offense", "geo"])
-    total_groups = len(groups)
-
-    for i, ((state, year, offense, geo), group) in enumerate(groups):
-        if i % 10000 == 0 and i > 0:
-            print(f"  Processed {i:,}/{total_groups:,} groups...")
-
-        # Sort by count descending, then by name for deterministic tie-breaking
-        sorted_group = group.sort_values(
-            ["count", "institution_name"],
-            ascending=[False, True]
-        ).reset_index(drop=True)
-
-        # Calculate total for percentage
-        total_count = sorted_group["count"].sum()
-
-        # Create rank by rate (only for schools with FTE data)
-        # Sort by rate descending, then by name for deterministic tie-breaking
-        rate_ranks = {}
-        schools_with_rate = sorted_group[sorted_group["rate_per_10k"].notna()].copy() if "rate_per_10k" in sorted_group.columns else pd.DataFrame()
-        if len(schools_with_rate) > 0:
-            schools_with_rate = schools_with_rate.sort_values(
-                ["rate_per_10k", "institution_name"],
-                ascending=[False, True]
-            )
-            for rate_rank, (_, rate_row) in enumerate(schools_with_rate.iterrows(), 1):
-                rate_ranks[rate_row["unitid"]] = rate_rank
-
-        for rank, (_, row) in enumerate(sorted_group.iterrows(), 1):
-            pct = (row["count"] / total_count * 100) if total_count > 0 else 0
-
-            rankings.append({
-                "state": state,
-                "year": year,
-                "offense": offense,
-                "offense_family": row["offense_family"],
-                "geo": geo,
-                "rank": rank,
-                "rank_by_rate": rate_ranks.get(row["unitid"]),
-                "unitid": row["unitid"],
-                "institution_name": row["institution_name"],
-                "short_name": row.get("short_name"),
-                "count": row["count"],
-                "pct_of_state_total": round(pct, 2),
-                "fte": row.get("fte") if pd.notna(row.get("fte")) else None,
-                "rate_per_10k": row.get("rate_per_10k") if pd.notna(row.get("rate_per_10k")) else None,
-            })
-
-    rankings_df = pd.DataFrame(rankings)
+    rankings_df = rank_schools(valid_data, ["state", "year", "offense", "geo"], "pct_of_state_total", [
+        "state", "year", "offense", "offense_family", "geo", "rank", "rank_by_rate", "unitid",
+        "institution_name", "short_name", "count", "pct_of_state_total", "fte", "rate_per_10k",
+    ])
 
     if len(rankings_df) == 0:
         print("  WARNING: No rankings generated")
@@ -519,57 +457,10 @@ def create_national_rankings(school_agg: pd.DataFrame = None) -> pd.DataFrame:
     valid_data["short_name"] = valid_data["unitid"].map(short_map)
 
     # Calculate rankings within each (year, offense, geo) group
-    rankings = []
-
-    groups = valid_data.groupby(["year", "offense", "geo"])
-    total_groups = len(groups)
-
-    for i, ((year, offense, geo), group) in enumerate(groups):
-        if i % 1000 == 0 and i > 0:
-            print(f"  Processed {i:,}/{total_groups:,} groups...")
-
-        # Sort by count descending, then by name for deterministic tie-breaking
-        sorted_group = group.sort_values(
-            ["count", "institution_name"],
-            ascending=[False, True]
-        ).reset_index(drop=True)
-
-        # Calculate total for percentage
-        total_count = sorted_group["count"].sum()
-
-        # Create rank by rate (only for schools with FTE data)
-        # Sort by rate descending, then by name for deterministic tie-breaking
-        rate_ranks = {}
-        schools_with_rate = sorted_group[sorted_group["rate_per_10k"].notna()].copy()
-        if len(schools_with_rate) > 0:
-            schools_with_rate = schools_with_rate.sort_values(
-                ["rate_per_10k", "institution_name"],
-                ascending=[False, True]
-            )
-            for rate_rank, (_, rate_row) in enumerate(schools_with_rate.iterrows(), 1):
-                rate_ranks[rate_row["unitid"]] = rate_rank
-
-        for rank, (_, row) in enumerate(sorted_group.iterrows(), 1):
-            pct = (row["count"] / total_count * 100) if total_count > 0 else 0
-
-            rankings.append({
-                "year": year,
-                "offense": offense,
-                "offense_family": row["offense_family"],
-                "geo": geo,
-                "rank": rank,
-                "rank_by_rate": rate_ranks.get(row["unitid"]),
-                "unitid": row["unitid"],
-                "institution_name": row["institution_name"],
-                "short_name": row.get("short_name"),
-                "state": row["state"],
-                "count": row["count"],
-                "pct_of_national_total": round(pct, 2),
-                "fte": row.get("fte") if pd.notna(row.get("fte")) else None,
-                "rate_per_10k": row.get("rate_per_10k") if pd.notna(row.get("rate_per_10k")) else None,
-            })
-
-    rankings_df = pd.DataFrame(rankings)
+    rankings_df = rank_schools(valid_data, ["year", "offense", "geo"], "pct_of_national_total", [
+        "year", "offense", "offense_family", "geo", "rank", "rank_by_rate", "unitid",
+        "institution_name", "short_name", "state", "count", "pct_of_national_total", "fte", "rate_per_10k",
+    ])
 
     if len(rankings_df) == 0:
         print("  WARNING: No rankings generated")
@@ -654,7 +545,8 @@ def main():
     print(f"Processing mode: {'Ivy League only' if ivy_only else 'ALL SCHOOLS (nationwide)'}")
 
     # Create aggregates
-    school_agg = create_school_year_offense_agg(ivy_only=ivy_only)
+    with Warehouse() as warehouse:
+        school_agg = create_school_year_offense_agg(warehouse, ivy_only=ivy_only)
     ivy_rankings = create_ivy_rankings(school_agg)
 
     # Create state and national rankings if processing all schools
@@ -16,14 +16,13 @@ Usage:
 import sys
 import json
 import argparse
-import pandas as pd
-import duckdb
 from pathlib import Path
 from datetime import datetime
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
 from config import CURATED_DIR, QA_DIR, JSON_DIR, IVY_LEAGUE, DATA_YEARS
+from warehouse import Warehouse
 
 
 class ValidationError(Exception):
@@ -31,17 +30,7 @@ class ValidationError(Exception):
     pass
 
 
-def get_facts_pattern() -> str:
-    """Get the glob pattern for reading fact files."""
-    facts_path = CURATED_DIR / "facts"
-
-    if (facts_path / "incidents").exists():
-        return str(facts_path / "incidents" / "**" / "*.parquet")
-    else:
-        return str(facts_path / "*.parquet")
-
-
-def validate_facts(verbose: bool = False) -> dict:
+def validate_facts(warehouse: Warehouse, verbose: bool = False) -> dict:
     """Run data quality checks on fact table."""
     print("Validating fact table...")
 
@@ -52,15 +41,14 @@ def validate_facts(verbose: bool = False) -> dict:
         }
     }
 
-    con = duckdb.connect()
-    facts_pattern = get_facts_pattern()
-
     try:
+        facts = warehouse.source("facts")
+
         # Check 1: Row counts per year
         print("  Checking row counts by year...")
-        year_counts = con.execute(f"""
+        year_counts = warehouse.execute(f"""
             SELECT year, COUNT(*) as records, SUM(count) as total_incidents
-            FROM read_parquet('{facts_pattern}')
+            FROM {facts}
             GROUP BY year
             ORDER BY year
         """).df()
@@ -74,9 +62,9 @@ def validate_facts(verbose: bool = False) -> dict:
 
         # Check 2: No negative counts
         print("  Checking for negative counts...")
-        negative_counts = con.execute(f"""
+        negative_counts = warehouse.execute(f"""
             SELECT COUNT(*) as negative_records
-            FROM read_parquet('{facts_pattern}')
+            FROM {facts}
             WHERE count < 0
         """).fetchone()[0]
 
@@ -89,9 +77,9 @@ def validate_facts(verbose: bool = False) -> dict:
 
         # Check 3: All Ivy League schools present
         print("  Checking Ivy League coverage...")
-        ivy_check = con.execute(f"""
+        ivy_check = warehouse.execute(f"""
             SELECT DISTINCT unitid
-            FROM read_parquet('{facts_pattern}')
+            FROM {facts}
             WHERE unitid IN ({', '.join(str(u) for u in IVY_LEAGUE.keys())})
         """).df()
 
@@ -110,13 +98,13 @@ def validate_facts(verbose: bool = False) -> dict:
 
         # Check 4: Offense coverage
         print("  Checking offense coverage...")
-        offenses = con.execute(f"""
+        offenses = warehouse.execute(f"""
             SELECT
                 offense,
                 offense_family,
                 COUNT(DISTINCT year) as years_present,
                 SUM(count) as total_count
-            FROM read_parquet('{facts_pattern}')
+            FROM {facts}
             GROUP BY offense, offense_family
             ORDER BY total_count DESC
         """).df()
@@ -131,12 +119,12 @@ def validate_facts(verbose: bool = False) -> dict:
 
         # Check 5: Geography coverage
         print("  Checking geography coverage...")
-        geos = con.execute(f"""
+        geos = warehouse.execute(f"""
             SELECT
                 geo,
                 COUNT(*) as records,
                 SUM(count) as total_count
-            FROM read_parquet('{facts_pattern}')
+            FROM {facts}
             GROUP BY geo
             ORDER BY total_count DESC
         """).df()
@@ -164,7 +152,7 @@ def validate_facts(verbose: bool = False) -> dict:
     return checks
 
 
-def validate_aggregates(verbose: bool = False) -> dict:
+def validate_aggregates(warehouse: Warehouse, verbose: bool = False) -> dict:
     """Validate aggregate tables."""
     print("\nValidating aggregates...")
 
@@ -180,14 +168,17 @@ def validate_aggregates(verbose: bool = False) -> dict:
     # Check school-year-offense aggregate
     agg_path = agg_dir / "agg_school_year_offense.parquet"
     if agg_path.exists():
-        agg = pd.read_parquet(agg_path)
+        rows, schools, years = warehouse.execute(f"""
+            SELECT COUNT(*), COUNT(DISTINCT unitid), list(DISTINCT year ORDER BY year)
+            FROM {warehouse.source("agg_school_year_offense")}
+        """).fetchone()
         checks["aggregates"]["checks"]["school_year_offense"] = {
             "exists": True,
-            "rows": len(agg),
-            "years": sorted(agg["year"].unique().tolist()),
-            "schools": agg["unitid"].nunique()
+            "rows": rows,
+            "years": years,
+            "schools": schools
         }
-        print(f"  school_year_offense: {len(agg):,} rows")
+        print(f"  school_year_offense: {rows:,} rows")
     else:
         checks["aggregates"]["checks"]["school_year_offense"] = {"exists": False}
         print(f"  school_year_offense: MISSING")
@@ -195,14 +186,17 @@ def validate_aggregates(verbose: bool = False) -> dict:
     # Check ivy rankings aggregate
     rankings_path = agg_dir / "agg_ivy_rankings.parquet"
     if rankings_path.exists():
-        rankings = pd.read_parquet(rankings_path)
+        rows, schools, years = warehouse.execute(f"""
+            SELECT COUNT(*), COUNT(DISTINCT unitid), list(DISTINCT year ORDER BY year)
+            FROM {warehouse.source("agg_ivy_rankings")}
+        """).fetchone()
         checks["aggregates"]["checks"]["ivy_rankings"] = {
             "exists": True,
-            "rows": len(rankings),
-            "years": sorted(rankings["year"].unique().tolist()),
-            "schools": rankings["unitid"].nunique()
+            "rows": rows,
+            "years": years,
+            "schools": schools
         }
-        print(f"  ivy_rankings: {len(rankings):,} rows")
+        print(f"  ivy_rankings: {rows:,} rows")
     else:
         checks["aggregates"]["checks"]["ivy_rankings"] = {"exists": False}
         print(f"  ivy_rankings: MISSING")
@@ -373,8 +367,9 @@ def main():
     print("Data Validation")
     print("=" * 60)
 
-    fact_checks = validate_facts(verbose=args.verbose)
-    agg_checks = validate_aggregates(verbose=args.verbose)
+    with Warehouse() as warehouse:
+        fact_checks = validate_facts(warehouse, verbose=args.verbose)
+        agg_checks = validate_aggregates(warehouse, verbose=args.verbose)
     json_checks = validate_json_files(verbose=args.verbose)
 
     report = generate_qa_report(fact_checks, agg_checks, json_checks)
@@ -25,14 +25,15 @@ import sys
 import json
 import argparse
 import pandas as pd
-import duckdb
 from pathlib import Path
 from datetime import datetime
+from functools import partial
 from typing import Optional
 
 # Add parent to path for config import
 sys.path.insert(0, str(Path(__file__).parent))
 from config import CURATED_DIR, QA_DIR, JSON_DIR, DATA_YEARS
+from warehouse import Warehouse
 
 
 class AuditResult:
@@ -66,16 +67,7 @@ class AuditResult:
         }
 
 
-def get_facts_pattern() -> str:
-    """Get the glob pattern for reading fact files."""
-    facts_path = CURATED_DIR / "facts"
-    if (facts_path / "incidents").exists():
-        return str(facts_path / "incidents" / "**" / "*.parquet")
-    else:
-        return str(facts_path / "*.parquet")
-
-
-def audit_school_completeness(verbose: bool = False) -> AuditResult:
+def audit_school_completeness(warehouse: Warehouse, verbose: bool = False) -> AuditResult:
     """
     CHECK 1: Verify all schools in facts have JSON files generated.
     """
@@ -84,12 +76,9 @@ def audit_school_completeness(verbose: bool = False) -> AuditResult:
 
     try:
         # Get unique schools from facts
-        con = duckdb.connect()
-        facts_pattern = get_facts_pattern()
-
-        facts_schools = con.execute(f"""
+        facts_schools = warehouse.execute(f"""
             SELECT DISTINCT unitid
-            FROM read_parquet('{facts_pattern}')
+            FROM {warehouse.source("facts")}
         """).df()
 
         facts_unitids = set(facts_schools["unitid"].tolist())
@@ -505,7 +494,7 @@ def audit_percentage_sums(verbose: bool = False) -> AuditResult:
     return result
 
 
-def audit_source_traceability(verbose: bool = False) -> AuditResult:
+def audit_source_traceability(warehouse: Warehouse, verbose: bool = False) -> AuditResult:
     """
     CHECK 7: Compare fact table totals to aggregate totals.
     Ensures no data loss during aggregation.
@@ -514,24 +503,23 @@ def audit_source_traceability(verbose: bool = False) -> AuditResult:
     print("\nCHECK 7: Source Traceability")
 
     try:
-        con = duckdb.connect()
-        facts_pattern = get_facts_pattern()
-
         # Get fact table totals by year
-        fact_totals = con.execute(f"""
+        fact_totals = warehouse.execute(f"""
             SELECT year, SUM(count) as total_incidents
-            FROM read_parquet('{facts_pattern}')
+            FROM {warehouse.source("facts")}
             GROUP BY year
             ORDER BY year
         """).df()
 
-        # Get aggregate totals by year (geo="All" to avoid double counting)
-        agg_path = CURATED_DIR / "aggs" / "agg_school_year_offense.parquet"
-        agg = pd.read_parquet(agg_path)
-
-        # Sum across schools and offenses for geo="All"
-        agg_totals = agg[agg["geo"] == "All"].groupby("year")["count"].sum().reset_index()
-        agg_totals.columns = ["year", "agg_total"]
+        # Get aggregate totals by year (geo="All" to avoid double counting),
+        # summed across schools and offenses
+        agg_totals = warehouse.execute(f"""
+            SELECT year, SUM(count)::BIGINT as agg_total
+            FROM {warehouse.source("agg_school_year_offense")}
+            WHERE geo = 'All'
+            GROUP BY year
+            ORDER BY year
+        """).df()
 
         # Compare
         comparison = fact_totals.merge(agg_totals, on="year", how="outer")
@@ -731,25 +719,25 @@ def main():
     print("=" * 60)
 
     results = []
-
-    # Run all checks
-    checks = [
-        audit_school_completeness,
-        audit_incident_totals,
-        audit_fte_coverage,
-        audit_rate_calculations,
-        audit_ranking_order,
-        audit_percentage_sums,
-        audit_source_traceability,
-    ]
-
-    for check_fn in checks:
-        result = check_fn(verbose=args.verbose)
-        results.append(result)
-
-        if args.stop_on_fail and result.status == "FAIL":
-            print(f"\n  Stopping due to --stop-on-fail")
-            break
+    with Warehouse() as warehouse:
+        # Run all checks
+        checks = [
+            partial(audit_school_completeness, warehouse),
+            audit_incident_totals,
+            audit_fte_coverage,
+            audit_rate_calculations,
+            audit_ranking_order,
+            audit_percentage_sums,
+            partial(audit_source_traceability, warehouse),
+        ]
+
+        for check_fn in checks:
+            result = check_fn(verbose=args.verbose)
+            results.append(result)
+
+            if args.stop_on_fail and result.status == "FAIL":
+                print(f"\n  Stopping due to --stop-on-fail")
+                break
 
     # Generate per-school report
     per_school_df = generate_per_school_report(verbose=args.verbose)
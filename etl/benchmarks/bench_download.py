@@ -0,0 +1,215 @@
+"""
+Benchmark the DOE and IPEDS downloaders against the local mirror server.
+
+Starts benchmarks/mirror_server.py on a free port, points
+01_download_raw_data.py and 01b_download_ipeds.py at it, and runs their
+real download jobs through a DownloadScheduler into a scratch directory
+for each concurrency setting:
+
+    cold  - empty directory, every file transferred (and IPEDS zips extracted)
+    warm  - same directory again, every file revalidated (304 Not Modified)
+
+For each pass it reports files/sec, MB/sec, HTTP requests and new
+connections, retries of failed requests, resumed transfers (206) and
+failed files, plus the faults the mirror injected.
+
+Usage:
+    python benchmarks/bench_download.py
+    python benchmarks/bench_download.py --workers 1,4,8,16 --per-host 4
+    python benchmarks/bench_download.py --latency 80 --bandwidth 10
+    python benchmarks/bench_download.py --fail-rate 0.1 --drop-rate 0.05 --backoff 0.05
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import importlib.util
+import requests
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# The per-file progress bar would interleave with the report
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+ETL_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ETL_DIR))
+
+from downloader import DownloadManifest, DownloadScheduler, DEFAULT_PER_HOST, FAILED
+from http_session import DEFAULT_RETRIES
+from raw_store import RawStore
+from mirror_server import DOE_PREFIX, IPEDS_PREFIX
+
+
+def load_module(filename: str, name: str):
+    """Import a numbered ETL script (not importable by name)."""
+    spec = importlib.util.spec_from_file_location(name, ETL_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+doe = load_module("01_download_raw_data.py", "download_raw_data")
+ipeds = load_module("01b_download_ipeds.py", "download_ipeds")
+
+
+class QuietScheduler(DownloadScheduler):
+    """Scheduler that only prints per-file messages when asked to."""
+
+    verbose = False
+
+    def log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+
+def start_mirror(args) -> Tuple[subprocess.Popen, str]:
+    """Start the mirror server on a free port; returns the process and its base URL."""
+    cmd = [
+        sys.executable, str(Path(__file__).parent / "mirror_server.py"),
+        "--port", "0",
+        "--latency", str(args.latency),
+        "--bandwidth", str(args.bandwidth),
+        "--fail-rate", str(args.fail_rate),
+        "--drop-rate", str(args.drop_rate),
+        "--crime-rows", str(args.crime_rows),
+        "--institutions", str(args.institutions),
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    first_line = process.stdout.readline()
+    if not first_line:
+        process.kill()
+        raise RuntimeError("Mirror server did not start")
+    base_url = first_line.split()[-1][:-len(DOE_PREFIX)]
+    process.stdout.readline()
+    return process, base_url
+
+
+def mirror_stats(base_url: str) -> Dict[str, int]:
+    """Fetch and reset the mirror's request counters."""
+    return requests.get(f"{base_url}/_stats?reset=1", timeout=10).json()
+
+
+def make_jobs(dataset: str, years: List[int], to_parquet: bool) -> dict:
+    """Build the scheduler jobs the downloaders' main() would run."""
+    jobs = {}
+    if dataset in ("doe", "all"):
+        for year in years:
+            jobs[("doe", year)] = lambda sched, year=year: doe.download_year(year, sched, "csv")
+    if dataset in ("ipeds", "all"):
+        for year in years:
+            for filename in ipeds.get_files_for_year(year):
+                jobs[("ipeds", year, filename)] = (
+                    lambda sched, year=year, filename=filename:
+                        ipeds.download_ipeds_file(year, filename, sched, to_parquet)
+                )
+    return jobs
+
+
+def run_pass(jobs: dict, root: Path, workers: int, args) -> dict:
+    """Run every job once into `root` and measure it."""
+    scheduler = QuietScheduler(
+        workers, args.per_host, DownloadManifest(root), retries=args.retries,
+        backoff=args.backoff, store=RawStore(root)
+    )
+    scheduler.verbose = args.verbose
+
+    start = time.perf_counter()
+    results = scheduler.run(jobs)
+    elapsed = time.perf_counter() - start
+    scheduler.session.close()
+
+    stats = scheduler.session.summary()
+    resumed = sum(1 for t in scheduler.session.timings if t.status == 206)
+    failed = sum(1 for status in results.values() if status in (FAILED, "download_failed", "extract_failed"))
+    return {
+        "files": len(jobs),
+        "seconds": elapsed,
+        "files_per_sec": len(jobs) / elapsed,
+        "mb_per_sec": stats["bytes"] / (1024 * 1024) / elapsed,
+        "requests": stats["requests"],
+        "connections": stats["new_connections"],
+        "retries": stats["retries"],
+        "resumed": resumed,
+        "failed": failed,
+    }
+
+
+def print_row(label: str, workers: int, result: dict, injected: Dict[str, int]) -> None:
+    print(f"{workers:>7} {label:<5} {result['files']:>5} {result['seconds']:>7.2f} "
+          f"{result['files_per_sec']:>7.1f} {result['mb_per_sec']:>7.1f} "
+          f"{result['requests']:>5} {result['connections']:>5} {result['retries']:>7} "
+          f"{result['resumed']:>7} {result['failed']:>6}   "
+          f"503:{injected.get('503', 0)} drop:{injected.get('dropped', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the downloaders against a local mirror server"
+    )
+    parser.add_argument("--workers", default="1,4,8", help="Comma-separated worker counts to compare")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                        help=f"Maximum concurrent requests to the mirror (default: {DEFAULT_PER_HOST})")
+    parser.add_argument("--dataset", default="all", choices=["doe", "ipeds", "all"])
+    parser.add_argument("--years", default="2015-2023", help="Year range, e.g. 2019-2023")
+    parser.add_argument("--parquet", action="store_true", help="Stream IPEDS members to Parquet")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--backoff", type=float, default=0.1, help="Base retry backoff (seconds)")
+    parser.add_argument("--latency", type=float, default=20.0, help="Mirror response delay (ms)")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Mirror per-connection cap (MB/s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of bodies cut off halfway")
+    parser.add_argument("--crime-rows", type=int, default=11000, help="Campuses per crime CSV")
+    parser.add_argument("--institutions", type=int, default=7000, help="Institutions per IPEDS file")
+    parser.add_argument("--verbose", action="store_true", help="Print per-file download messages")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    first, _, last = args.years.partition("-")
+    years = list(range(int(first), int(last or first) + 1))
+    jobs = make_jobs(args.dataset, years, args.parquet)
+
+    print("=" * 60)
+    print("Download Benchmark")
+    print("=" * 60)
+    print(f"Dataset: {args.dataset}, years {years[0]}-{years[-1]} ({len(jobs)} files)")
+    print(f"Mirror: {args.latency:.0f} ms latency, "
+          f"{f'{args.bandwidth} MB/s' if args.bandwidth else 'unlimited'} per connection, "
+          f"{args.fail_rate:.0%} 503s, {args.drop_rate:.0%} dropped bodies")
+    print(f"Per host: {args.per_host}, retries: {args.retries}, backoff: {args.backoff}s")
+
+    mirror, base_url = start_mirror(args)
+    doe.DOE_BASE_URL = f"{base_url}{DOE_PREFIX}"
+    ipeds.IPEDS_BASE_URL = f"{base_url}{IPEDS_PREFIX}"
+
+    try:
+        # Generate every file up front so the first pass measures transfer only
+        scratch = Path(tempfile.mkdtemp(prefix="bench_download_"))
+        doe.RAW_DIR, ipeds.IPEDS_RAW_DIR = scratch, scratch / "ipeds"
+        run_pass(jobs, scratch, max(worker_counts), args)
+        shutil.rmtree(scratch)
+        mirror_stats(base_url)
+
+        print(f"\n{'workers':>7} {'pass':<5} {'files':>5} {'seconds':>7} {'files/s':>7} {'MB/s':>7} "
+              f"{'reqs':>5} {'conns':>5} {'retries':>7} {'resumed':>7} {'failed':>6}   injected")
+        for workers in worker_counts:
+            root = Path(tempfile.mkdtemp(prefix="bench_download_"))
+            doe.RAW_DIR, ipeds.IPEDS_RAW_DIR = root, root / "ipeds"
+            try:
+                for label in ("cold", "warm"):
+                    result = run_pass(jobs, root, workers, args)
+                    print_row(label, workers, result, mirror_stats(base_url))
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        mirror.terminate()
+        mirror.wait()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
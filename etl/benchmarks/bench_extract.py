@@ -0,0 +1,150 @@
+"""
+Benchmark the vectorized offense extraction against the original row-wise loop.
+
+Runs both implementations of the wide-to-long unpivot on the same input,
+checks that they produce identical records, and reports timings.
+
+By default a synthetic frame shaped like a nationwide DOE file is generated
+(~11,000 campuses, every OFFENSE_MAP code x 3 year columns). Pass --file to
+benchmark against a real SAS file from data/raw/.
+
+Usage:
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --rows 20000
+    python benchmarks/bench_extract.py --file ../data/raw/oncampuscrime212223.sas7bdat
+"""
+
+import sys
+import time
+import random
+import argparse
+import importlib.util
+import pandas as pd
+from pathlib import Path
+from typing import List
+
+ETL_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ETL_DIR))
+
+
+def load_transform_module():
+    """Import 02_transform_to_parquet.py (not importable by name)."""
+    spec = importlib.util.spec_from_file_location(
+        "transform_to_parquet", ETL_DIR / "02_transform_to_parquet.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+transform = load_transform_module()
+
+
+def extract_rowwise(df: pd.DataFrame, category: str, years: List[int]) -> pd.DataFrame:
+    """Reference implementation: the original per-cell iterrows() loop."""
+    records = []
+    family = transform.CATEGORY_MAP[category]
+
+    unitid_col = None
+    for col in ["_base_unitid", "UNITID_P", "UNITID"]:
+        if col in df.columns:
+            unitid_col = col
+            break
+
+    for offense_code, offense_name in transform.OFFENSE_MAP.items():
+        if category in ["arrest", "discipline"]:
+            display_name = f"{offense_name} {category.title()}"
+        else:
+            display_name = offense_name
+
+        for year in years:
+            col_found = f"{offense_code}{str(year)[-2:]}"
+            if col_found not in df.columns:
+                continue
+
+            for _, row in df.iterrows():
+                try:
+                    unitid = int(row[unitid_col])
+                    count = row[col_found]
+                    if pd.isna(count):
+                        continue
+                    count = int(float(count))
+                    if count <= 0:
+                        continue
+                    records.append({
+                        "year": year,
+                        "unitid": unitid,
+                        "offense": display_name,
+                        "offense_family": family,
+                        "count": count,
+                    })
+                except (ValueError, TypeError):
+                    continue
+
+    return pd.DataFrame(records)
+
+
+def make_synthetic_frame(n_rows: int, years: List[int], seed: int = 0) -> pd.DataFrame:
+    """Build a wide DOE-style frame with mostly-zero offense counts."""
+    rng = random.Random(seed)
+    data = {"UNITID_P": [float(100000001 + i * 1000) for i in range(n_rows)]}
+    for offense_code in transform.OFFENSE_MAP:
+        for year in years:
+            col = f"{offense_code}{str(year)[-2:]}"
+            data[col] = [
+                None if rng.random() < 0.1 else float(rng.choice([0, 0, 0, 0, 1, 2, 5, 17]))
+                for _ in range(n_rows)
+            ]
+    return pd.DataFrame(data)
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark vectorized vs row-wise offense extraction"
+    )
+    parser.add_argument("--file", type=Path, help="Benchmark a real DOE SAS file")
+    parser.add_argument("--rows", type=int, default=11000, help="Synthetic row count")
+    parser.add_argument("--category", default="crime", choices=sorted(transform.CATEGORY_MAP))
+    args = parser.parse_args()
+
+    if args.file:
+        parsed = transform.parse_filename(args.file.name)
+        if parsed is None:
+            print(f"Unrecognized DOE filename: {args.file.name}")
+            return 1
+        _, category, years = parsed
+        df = transform.read_sas_file(args.file, transform.needed_columns(years))
+        source = args.file.name
+    else:
+        category = args.category
+        years = [2021, 2022, 2023]
+        df = make_synthetic_frame(args.rows, years)
+        source = f"synthetic ({args.rows:,} rows)"
+
+    print("=" * 60)
+    print("Offense Extraction Benchmark")
+    print("=" * 60)
+    print(f"Source: {source}")
+    print(f"Shape: {df.shape[0]:,} rows x {df.shape[1]} columns")
+
+    vectorized, vec_seconds = time_call(transform.extract_offense_data, df, category, years)
+    print(f"\nVectorized: {vec_seconds:.3f}s ({len(vectorized):,} records)")
+
+    rowwise, row_seconds = time_call(extract_rowwise, df, category, years)
+    print(f"Row-wise:   {row_seconds:.3f}s ({len(rowwise):,} records)")
+
+    pd.testing.assert_frame_equal(vectorized, rowwise, check_dtype=False)
+    print("\nOutputs identical")
+    print(f"Speedup: {row_seconds / vec_seconds:.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Local stand-in for ope.ed.gov and nces.ed.gov, for benchmarking downloads.
+
+Serves synthetic files at the same paths as the real sites:
+
+    /campussafety/datafiles/{year}/Crime{year}.csv
+    /ipeds/datacenter/data/{EF,HD,DRVEF,EFFY}{year}[A].zip
+
+Crime CSVs are wide DOE-style files: one row per campus, with offense
+counts in geography-suffixed columns (MURD11, RAPE13, ...) as stage 02
+reads them. IPEDS zips hold the {stem}.csv data member with the columns
+the enrollment stages read, a revised _rv variant and a dictionary, like
+the real ones. Content is generated deterministically per file, so ETags
+are stable across restarts. Anything else (e.g. the .sas7bdat URLs) is a
+404, which exercises the downloaders' fallbacks.
+
+The server speaks HTTP/1.1 with keep-alive, ETag/Last-Modified validators,
+If-None-Match / If-Modified-Since (304), Range and If-Range (206/416),
+and can inject:
+    --latency     delay before each response (ms)
+    --bandwidth   per-connection transfer cap (MB/s)
+    --fail-rate   fraction of requests answered 503
+    --drop-rate   fraction of bodies cut off halfway
+
+GET /_stats returns request counters as JSON (?reset=1 clears them).
+
+Usage:
+    python benchmarks/mirror_server.py
+    python benchmarks/mirror_server.py --port 8800 --latency 50 --bandwidth 20
+    python benchmarks/mirror_server.py --fail-rate 0.1 --drop-rate 0.05
+"""
+
+import io
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import zipfile
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import GEO_CODES
+
+DOE_PREFIX = "/campussafety/datafiles"
+IPEDS_PREFIX = "/ipeds/datacenter/data"
+
+# Offense field prefixes of the synthetic crime files (one name per offense
+# from config.OFFENSE_CODES), each suffixed with every GEO_CODES code
+OFFENSE_CODES = [
+    "MURD", "NEGMAN", "RAPE", "FONDL", "INCEST", "STATR", "ROBBE", "AGG",
+    "BURGLA", "VEHIC", "ARSON", "DOMEST", "DATING", "STALK",
+    "WEAPON", "DRUG", "LIQUOR", "WEAPD", "DRUGD", "LIQUORD",
+]
+
+# Data columns of each IPEDS family (beyond UNITID)
+IPEDS_COLUMNS = {
+    "DRVEF": ["ENRTOT", "FTE", "ENRFT", "ENRPT", "EFUG", "EFGRAD"],
+    "EF": ["EFALEVEL", "LINE", "SECTION", "LSTUDY", "EFTOTLT", "EFTOTLM", "EFTOTLW"],
+    "EFFY": ["EFFYLEV", "LSTUDY", "EFYTOTLT", "EFYTOTLM", "EFYTOTLW"],
+    "HD": ["OPEID", "STABBR", "SECTOR", "CONTROL", "LATITUDE", "LONGITUD", "C21BASIC"],
+}
+
+# Rows per EF institution (one per EFALEVEL) and per EFFY institution
+EF_LEVELS = [1, 2, 3, 4, 12, 22, 32, 41, 42, 52]
+EFFY_LEVELS = [1, 2, 3, 4]
+
+# Fixed Last-Modified of every file
+LAST_MODIFIED_TS = 1_700_000_000
+LAST_MODIFIED = formatdate(LAST_MODIFIED_TS, usegmt=True)
+
+# Bytes written per throttled chunk
+CHUNK_SIZE = 16 * 1024
+
+
+def crime_csv(year: int, rows: int) -> bytes:
+    """Build a wide DOE-style crime CSV for one year (OFFENSE_CODE + GEO_CODE columns)."""
+    rng = np.random.default_rng(year)
+    data = {
+        "UNITID_P": 100000001 + np.arange(rows) * 1000,
+        "INSTNM": [f"Institution {i}" for i in range(rows)],
+        "BRANCH": "Main Campus",
+        "State": rng.choice(["CA", "NY", "TX", "PA", "MA", "OH"], rows),
+        "Total": rng.integers(100, 60000, rows),
+    }
+    for code in OFFENSE_CODES:
+        for geo_code in GEO_CODES:
+            data[f"{code}{geo_code}"] = rng.choice([0, 0, 0, 0, 1, 2, 5, 17], rows)
+    return pd.DataFrame(data).to_csv(index=False).encode("utf-8")
+
+
+def not_modified_since(header: str) -> bool:
+    """Check an If-Modified-Since value against the files' Last-Modified."""
+    try:
+        return parsedate_to_datetime(header).timestamp() >= LAST_MODIFIED_TS
+    except (TypeError, ValueError):
+        return False
+
+
+def ipeds_csv(family: str, year: int, institutions: int) -> bytes:
+    """Build the data CSV of an IPEDS family for one year."""
+    rng = np.random.default_rng([year, len(family)])
+    unitids = 100000 + np.arange(institutions) * 3
+    levels = {"EF": EF_LEVELS, "EFFY": EFFY_LEVELS}.get(family, [None])
+    unitid = np.repeat(unitids, len(levels))
+    data = {"UNITID": unitid}
+    for col in IPEDS_COLUMNS[family]:
+        if col in ("EFALEVEL", "EFFYLEV"):
+            data[col] = np.tile(levels, institutions)
+        elif col in ("LATITUDE", "LONGITUD"):
+            data[col] = np.round(rng.uniform(25, 48, len(unitid)), 6)
+        elif col == "STABBR":
+            data[col] = rng.choice(["CA", "NY", "TX", "PA", "MA", "OH"], len(unitid))
+        else:
+            data[col] = rng.integers(0, 30000, len(unitid))
+    return pd.DataFrame(data).to_csv(index=False).encode("utf-8")
+
+
+def ipeds_zip(name: str, institutions: int) -> Optional[bytes]:
+    """Build an IPEDS zip like EF2019A.zip, or None for an unknown name."""
+    match = re.fullmatch(r"([A-Z]+)(\d{4})(A?)", name)
+    if not match or match.group(1) not in IPEDS_COLUMNS:
+        return None
+    family, year = match.group(1), int(match.group(2))
+    if (family == "EF") != bool(match.group(3)):
+        return None
+
+    stem = name.lower()
+    data = ipeds_csv(family, year, institutions)
+    dictionary = "\n".join(["varname,vartitle"] + [f"{c},{c} title" for c in IPEDS_COLUMNS[family]])
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{stem}.csv", data)
+        zf.writestr(f"{stem}_rv.csv", data)
+        zf.writestr(f"{stem}_dict.csv", dictionary)
+    return buffer.getvalue()
+
+
+class MirrorState:
+    """Generated files, fault settings and request counters shared by handlers."""
+
+    def __init__(
+        self,
+        crime_rows: int = 11000,
+        institutions: int = 7000,
+        latency: float = 0.0,
+        bandwidth: float = 0.0,
+        fail_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.crime_rows = crime_rows
+        self.institutions = institutions
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._files: Dict[str, Optional[Tuple[bytes, str]]] = {}
+        self._lock = threading.Lock()
+
+    def roll(self, rate: float) -> bool:
+        """Draw a fault with probability `rate`."""
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def file(self, path: str) -> Optional[Tuple[bytes, str]]:
+        """Get (content, etag) for a URL path, generating it on first use."""
+        with self._lock:
+            if path in self._files:
+                return self._files[path]
+
+        content = None
+        doe = re.fullmatch(rf"{DOE_PREFIX}/(\d{{4}})/Crime(\d{{4}})\.csv", path)
+        ipeds = re.fullmatch(rf"{IPEDS_PREFIX}/(\w+)\.zip", path)
+        if doe and doe.group(1) == doe.group(2):
+            content = crime_csv(int(doe.group(1)), self.crime_rows)
+        elif ipeds:
+            content = ipeds_zip(ipeds.group(1), self.institutions)
+
+        entry = None
+        if content is not None:
+            entry = (content, f'"{hashlib.sha256(content).hexdigest()[:16]}"')
+        with self._lock:
+            self._files[path] = entry
+        return entry
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MirrorState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            self.send_stats("reset" in parse_qs(url.query))
+            return
+
+        state = self.state
+        state.count("requests")
+        if state.latency:
+            time.sleep(state.latency)
+
+        entry = state.file(url.path)
+        if entry is None:
+            state.count("404")
+            self.send_empty(404)
+            return
+        if state.roll(state.fail_rate):
+            state.count("503")
+            self.send_empty(503)
+            return
+
+        content, etag = entry
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if (if_none_match == etag if if_none_match is not None
+                else if_modified_since is not None and not_modified_since(if_modified_since)):
+            state.count("304")
+            self.send_empty(304, etag)
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range in (etag, LAST_MODIFIED)):
+            match = re.fullmatch(r"bytes=(\d+)-", range_header.strip())
+            if match:
+                start = int(match.group(1))
+                if start >= len(content):
+                    state.count("416")
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(content)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+        body = content[start:]
+        self.send_response(206 if start else 200)
+        state.count("206" if start else "200")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        self.end_headers()
+
+        if state.roll(state.drop_rate):
+            state.count("dropped")
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.send_body(body)
+
+    def send_body(self, body: bytes) -> None:
+        """Write a body, throttled to the configured bandwidth."""
+        bandwidth = self.state.bandwidth
+        started = time.perf_counter()
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = body[offset:offset + CHUNK_SIZE]
+            try:
+                self.wfile.write(chunk)
+            except OSError:
+                self.close_connection = True
+                return
+            self.state.count("bytes", len(chunk))
+            if bandwidth:
+                ahead = (offset + len(chunk)) / bandwidth - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def send_empty(self, status: int, etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if status != 304:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_stats(self, reset: bool) -> None:
+        with self.state._lock:
+            body = json.dumps(dict(self.state.stats)).encode("utf-8")
+            if reset:
+                self.state.stats.clear()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host: str, port: int, state: MirrorState) -> ThreadingHTTPServer:
+    """Create a threaded mirror server bound to (host, port)."""
+    handler = type("BoundMirrorHandler", (MirrorHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve synthetic DOE and IPEDS files for download benchmarks"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay before each response (ms)")
+    parser.add_argument("--bandwidth", type=float, default=0.0,
+                        help="Per-connection transfer cap in MB/s (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of bodies cut off halfway")
+    parser.add_argument("--crime-rows", type=int, default=11000, help="Campuses per crime CSV")
+    parser.add_argument("--institutions", type=int, default=7000, help="Institutions per IPEDS file")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for fault injection")
+    args = parser.parse_args()
+
+    state = MirrorState(
+        args.crime_rows, args.institutions, args.latency / 1000, args.bandwidth * 1024 * 1024,
+        args.fail_rate, args.drop_rate, args.seed
+    )
+    server = make_server(args.host, args.port, state)
+    base = f"http://{args.host}:{server.server_port}"
+    print(f"DOE base URL:   {base}{DOE_PREFIX}", flush=True)
+    print(f"IPEDS base URL: {base}{IPEDS_PREFIX}", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,10 +14,27 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
 RAW_DIR = PROJECT_ROOT / "data" / "raw"
+STAGED_DIR = RAW_DIR / "_staged"  # Columnar copies of raw SAS files, keyed by sha256
 CURATED_DIR = PROJECT_ROOT / "data" / "curated"
+EXTRACT_CACHE_DIR = CURATED_DIR / "_cache" / "extract"  # Per-source-file tidy partitions
 QA_DIR = PROJECT_ROOT / "data" / "qa"
 JSON_DIR = PROJECT_ROOT / "frontend" / "public" / "data"
 
+# =============================================================================
+# DUCKDB WAREHOUSE
+# =============================================================================
+
+# Set to True to keep facts, dims and aggregates in one persistent DuckDB
+# file shared by stages 03-07 (see warehouse.py); False queries Parquet
+# from an in-memory connection per stage
+USE_WAREHOUSE = False
+WAREHOUSE_PATH = CURATED_DIR / "warehouse.duckdb"
+
+# DuckDB resource settings for every pipeline connection (None = DuckDB default)
+DUCKDB_MEMORY_LIMIT = None  # e.g. "4GB"
+DUCKDB_THREADS = None       # e.g. 4
+DUCKDB_TEMP_DIR = None      # Spill directory for larger-than-memory operators
+
 # =============================================================================
 # IVY LEAGUE SCHOOLS (UNITID mapping)
 # =============================================================================
@@ -105,6 +122,21 @@ US_STATES = {
 # All valid state codes
 VALID_STATE_CODES = set(US_STATES.keys())
 
+# IPEDS HD sector codes (SECTOR variable)
+IPEDS_SECTORS = {
+    0: "Administrative Unit",
+    1: "Public, 4-year or above",
+    2: "Private nonprofit, 4-year or above",
+    3: "Private for-profit, 4-year or above",
+    4: "Public, 2-year",
+    5: "Private nonprofit, 2-year",
+    6: "Private for-profit, 2-year",
+    7: "Public, less-than 2-year",
+    8: "Private nonprofit, less-than 2-year",
+    9: "Private for-profit, less-than 2-year",
+    99: "Sector unknown (not active)",
+}
+
 # =============================================================================
 # GEOGRAPHY CODES
 # =============================================================================
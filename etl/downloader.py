@@ -0,0 +1,448 @@
+"""
+Shared download scheduler for the DOE and IPEDS downloaders.
+
+01_download_raw_data.py and 01b_download_ipeds.py describe their work as
+jobs - one per logical file, e.g. a year of crime data or one IPEDS zip -
+and hand them to a DownloadScheduler. Jobs run on a bounded thread pool,
+so a full refresh is limited by bandwidth rather than by one request's
+latency after another. Every HTTP request also holds a per-host slot,
+which keeps the number of simultaneous connections to ope.ed.gov or
+nces.ed.gov polite no matter how many workers are configured.
+
+Progress is one aggregate bar (bytes across all files, files completed);
+per-file messages are written above it.
+
+Downloads are staged as {name}.part and renamed into place only when
+complete, so an interrupted run leaves a .part that the next run resumes
+with an HTTP Range request instead of a truncated file at the final name.
+
+All requests share one pooled HTTPSession (see http_session.py) with
+keep-alive connections, retry/backoff and per-request timings; a stream
+that breaks off mid-transfer is retried by resuming its .part.
+
+Each download root keeps a download_manifest.json recording the ETag,
+Last-Modified, size and sha256 of every file. Files already on disk are
+revalidated with If-None-Match / If-Modified-Since, so a refresh only
+transfers files the server has actually republished; everything else is
+a 304 Not Modified.
+
+With a RawStore (see raw_store.py), every file a job downloads or
+revalidates is also recorded in the content-addressed raw store.
+"""
+
+import re
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlsplit
+from tqdm import tqdm
+
+from http_session import HTTPSession, DEFAULT_RETRIES, DEFAULT_BACKOFF
+from raw_store import RawStore
+from utils import sha256_file, load_json, safe_json_dump
+
+# Concurrent jobs, and concurrent requests to any single host
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+
+# Bytes per streamed chunk
+CHUNK_SIZE = 64 * 1024
+
+# download_file outcomes
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not_modified"
+FAILED = "failed"
+
+
+class DownloadManifest:
+    """
+    Validators and checksums of downloaded files, keyed by path under `root`.
+
+    Entries look like:
+        {"url": ..., "etag": ..., "last_modified": ..., "size": ...,
+         "sha256": ..., "downloaded_at": ...}
+    plus a "partial" block with the validators of an in-progress .part, so
+    a resumed download can be tied to the version it started from.
+
+    Safe to update from scheduler worker threads; every update is written
+    to disk atomically so a killed run keeps what it already recorded.
+    """
+
+    def __init__(self, root: Path, filename: str = "download_manifest.json"):
+        self.root = root
+        self.path = root / filename
+        self._entries = load_json(self.path) if self.path.exists() else {}
+        self._lock = threading.Lock()
+
+    def key(self, dest_path: Path) -> str:
+        """Manifest key for a file: its path relative to the root."""
+        return dest_path.relative_to(self.root).as_posix()
+
+    def get(self, dest_path: Path) -> dict:
+        """Get a copy of the entry for a file ({} if none)."""
+        with self._lock:
+            return dict(self._entries.get(self.key(dest_path), {}))
+
+    def update(self, dest_path: Path, **fields) -> None:
+        """Merge fields into a file's entry (None values remove the field) and save."""
+        with self._lock:
+            entry = self._entries.setdefault(self.key(dest_path), {})
+            for name, value in fields.items():
+                if value is None:
+                    entry.pop(name, None)
+                else:
+                    entry[name] = value
+            self._save()
+
+    def _save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        safe_json_dump(self._entries, tmp_path)
+        tmp_path.replace(self.path)
+
+
+class DownloadScheduler:
+    """Run download jobs on a bounded thread pool with per-host limits."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        per_host: int = DEFAULT_PER_HOST,
+        manifest: Optional[DownloadManifest] = None,
+        force: bool = False,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        store: Optional[RawStore] = None
+    ):
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.manifest = manifest
+        self.force = force
+        self.store = store
+        self.session = HTTPSession(retries, backoff, pool_size=self.per_host)
+        self.progress: Optional[tqdm] = None
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Get the semaphore limiting concurrent requests to the URL's host."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def log(self, message: str) -> None:
+        """Print a message without breaking the progress bar."""
+        tqdm.write(message)
+
+    def download(self, url: str, dest_path: Path, timeout: int = 60) -> str:
+        """
+        Download a file, holding a slot for the URL's host while streaming.
+
+        Files that end up current on disk are recorded in the raw store, if any.
+
+        Returns: DOWNLOADED, NOT_MODIFIED or FAILED
+        """
+        with self.host_slot(url):
+            status = download_file(
+                url, dest_path, timeout, self.progress, self.log, self.manifest, self.force,
+                self.session
+            )
+
+        if self.store is not None and status != FAILED:
+            # A fresh download's hash was just recorded in the manifest
+            sha256 = None
+            if status == DOWNLOADED and self.manifest is not None:
+                sha256 = self.manifest.get(dest_path).get("sha256")
+            self.store.add(dest_path, sha256=sha256, url=url)
+        return status
+
+    def run(self, jobs: Dict[Hashable, Callable[["DownloadScheduler"], Any]]) -> Dict[Hashable, Any]:
+        """
+        Run every job concurrently and collect its return value.
+
+        Each job is called with this scheduler, so it can call download()
+        (possibly several times, e.g. to try fallback URLs).
+
+        Returns: {job key: job result} in the order jobs were given
+        """
+        results = {}
+        with tqdm(
+            total=0,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+            desc="Downloading"
+        ) as self.progress, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(job, self): key for key, job in jobs.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                self.progress.set_postfix_str(f"{done}/{len(futures)} files")
+        self.progress = None
+
+        return {key: results[key] for key in jobs}
+
+
+def part_path(dest_path: Path) -> Path:
+    """Get the staging path a download is written to before completion."""
+    return dest_path.with_name(dest_path.name + ".part")
+
+
+def parse_content_range(value: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a Content-Range header like "bytes 100-199/1000" or "bytes */1000".
+
+    Returns: (first byte or None, total size or None)
+    """
+    match = re.fullmatch(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)", value.strip())
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(total) if total != "*" else None,
+    )
+
+
+def conditional_headers(dest_path: Path, url: str, entry: dict) -> Dict[str, str]:
+    """
+    Build If-None-Match / If-Modified-Since headers for a file already on disk.
+
+    Uses the validators recorded for the same URL; files downloaded before
+    the manifest existed fall back to their modification time.
+    """
+    headers = {}
+    if entry.get("url") == url:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    if not headers:
+        headers["If-Modified-Since"] = formatdate(dest_path.stat().st_mtime, usegmt=True)
+    return headers
+
+
+def range_headers(offset: int, url: str, partial: dict) -> Dict[str, str]:
+    """
+    Build Range / If-Range headers to resume a .part at `offset`.
+
+    If-Range makes the server send the whole (new) file instead of the
+    remaining bytes when it has changed since the part was started.
+    """
+    headers = {"Range": f"bytes={offset}-"}
+    if partial.get("url") == url:
+        etag = partial.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["If-Range"] = etag
+        elif partial.get("last_modified"):
+            headers["If-Range"] = partial["last_modified"]
+    return headers
+
+
+class IncompleteDownload(requests.exceptions.RequestException):
+    """The body broke off, or ended before the size the server announced."""
+
+
+# Mid-stream failures worth retrying: the .part is kept, so a retry resumes
+# it. Connection errors, timeouts before the response and 429/5xx statuses
+# are already retried by the session's urllib3 Retry policy; retrying them
+# here as well would multiply the attempts.
+RETRYABLE_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    IncompleteDownload,
+)
+
+
+def download_file(
+    url: str,
+    dest_path: Path,
+    timeout: int = 60,
+    progress: Optional[tqdm] = None,
+    log: Callable[[str], None] = print,
+    manifest: Optional[DownloadManifest] = None,
+    force: bool = False,
+    session: Optional[HTTPSession] = None
+) -> str:
+    """
+    Download a file, adding its bytes to a shared progress bar if given.
+
+    Data is written to dest_path + ".part" and renamed into place only once
+    its size matches what the server announced, so dest_path never holds a
+    partial file. A .part left by a failed or killed run is resumed with an
+    HTTP Range request; if the server ignores the range or the part does
+    not line up, the download restarts from zero.
+
+    If dest_path already exists, the request is conditional and a 304
+    leaves the file untouched. With `force`, existing files and parts are
+    re-downloaded unconditionally (the old file stays in place until the
+    new one is complete). Validators, size and sha256 are recorded in
+    `manifest` when given.
+
+    Requests go through `session` (a new pooled session if None). Besides
+    the session's own retries of failed connections and 5xx responses, a
+    transfer that breaks off mid-stream is retried with backoff, resuming
+    from the .part.
+
+    Returns: DOWNLOADED, NOT_MODIFIED or FAILED (the .part is kept for resuming)
+    """
+    if session is None:
+        session = HTTPSession()
+    if force:
+        part_path(dest_path).unlink(missing_ok=True)
+
+    attempt = 0
+    while True:
+        try:
+            return fetch_file(url, dest_path, timeout, progress, log, manifest, force, session)
+        except RETRYABLE_ERRORS as e:
+            if attempt >= session.retries:
+                log(f"  Failed: {url}: {e}")
+                return FAILED
+            delay = session.backoff_delay(attempt)
+            log(f"  Retrying {dest_path.name} in {delay:.1f}s: {e}")
+            time.sleep(delay)
+            attempt += 1
+        except requests.exceptions.RequestException as e:
+            log(f"  Failed: {url}: {e}")
+            return FAILED
+
+
+def fetch_file(
+    url: str,
+    dest_path: Path,
+    timeout: int,
+    progress: Optional[tqdm],
+    log: Callable[[str], None],
+    manifest: Optional[DownloadManifest],
+    force: bool,
+    session: HTTPSession
+) -> str:
+    """
+    Make one attempt at download_file's work.
+
+    Raises requests exceptions (including IncompleteDownload) on failure.
+
+    Returns: DOWNLOADED or NOT_MODIFIED
+    """
+    entry = manifest.get(dest_path) if manifest else {}
+    tmp_path = part_path(dest_path)
+
+    offset = tmp_path.stat().st_size if tmp_path.exists() else 0
+    if offset:
+        headers = range_headers(offset, url, entry.get("partial", {}))
+    elif dest_path.exists() and not force:
+        headers = conditional_headers(dest_path, url, entry)
+    else:
+        headers = {}
+    # Ask for the body as stored: sizes and byte ranges must count the same
+    # bytes that are written to the .part (iter_content would decode gzip)
+    headers["Accept-Encoding"] = "identity"
+
+    response = session.get(url, stream=True, timeout=timeout, headers=headers)
+
+    if response.status_code == 304:
+        # Drain the empty body so the keep-alive connection goes back to the pool
+        response.raw.drain_conn()
+        response.close()
+        log(f"  Not modified: {dest_path.name}")
+        return NOT_MODIFIED
+
+    if response.status_code == 416 and offset:
+        # Nothing left to send: the part is complete if its size is the total
+        _, total = parse_content_range(response.headers.get("content-range", ""))
+        response.raw.drain_conn()
+        response.close()
+        if total == offset:
+            return finish_download(url, dest_path, manifest, entry.get("partial", {}))
+        log(f"  Discarding stale partial download: {tmp_path.name}")
+        tmp_path.unlink()
+        return fetch_file(url, dest_path, timeout, progress, log, manifest, force, session)
+
+    if response.status_code >= 400:
+        response.close()
+        response.raise_for_status()
+
+    expected = None
+    if response.status_code == 206:
+        start, expected = parse_content_range(response.headers.get("content-range", ""))
+        if start != offset:
+            log(f"  Unexpected range from server, restarting: {dest_path.name}")
+            response.close()
+            tmp_path.unlink()
+            return fetch_file(url, dest_path, timeout, progress, log, manifest, force, session)
+        log(f"  Resuming {dest_path.name} at {offset:,} bytes")
+        mode = 'ab'
+    else:
+        # Full response: nothing to resume, the server ignored the range,
+        # or the file changed since the part was started
+        offset = 0
+        mode = 'wb'
+        if manifest:
+            manifest.update(dest_path, partial={
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            })
+
+    content_length = response.headers.get('content-length')
+    if content_length is not None:
+        remaining = int(content_length)
+        if expected is None:
+            expected = offset + remaining
+        if progress is not None:
+            with progress.get_lock():
+                progress.total += remaining
+                progress.refresh()
+
+    timing = response.timing
+    start_time = time.perf_counter()
+    try:
+        with open(tmp_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    timing.bytes += len(chunk)
+                    if progress is not None:
+                        with progress.get_lock():
+                            progress.update(len(chunk))
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        # Raised by iter_content for read timeouts and resets while streaming
+        raise IncompleteDownload(f"{dest_path.name}: stream broke off: {e}") from e
+    finally:
+        timing.transfer = time.perf_counter() - start_time
+
+    size = tmp_path.stat().st_size
+    if expected is not None and size != expected:
+        raise IncompleteDownload(f"{dest_path.name}: {size:,} of {expected:,} bytes")
+
+    partial = manifest.get(dest_path).get("partial", {}) if manifest else {}
+    return finish_download(url, dest_path, manifest, partial)
+
+
+def finish_download(
+    url: str,
+    dest_path: Path,
+    manifest: Optional[DownloadManifest],
+    partial: dict
+) -> str:
+    """Move a complete .part into place and record it in the manifest."""
+    tmp_path = part_path(dest_path)
+    if manifest:
+        manifest.update(
+            dest_path,
+            url=url,
+            etag=partial.get("etag"),
+            last_modified=partial.get("last_modified"),
+            size=tmp_path.stat().st_size,
+            sha256=sha256_file(tmp_path),
+            downloaded_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            partial=None,
+        )
+    tmp_path.replace(dest_path)
+    return DOWNLOADED
@@ -0,0 +1,320 @@
+"""
+Incremental enrollment builder shared by 02a, 02b and 04.
+
+Enrollment (FTE and headcounts per institution and year) comes from one
+IPEDS file per year:
+    - DRVEF (Derived Fall Enrollment) for 2021-2023: pre-calculated FTE
+    - EF part A (Fall Enrollment) for 2015-2020: FTE calculated from the
+      full-time/part-time breakdown with the official IPEDS factors below
+
+Each year is built into its own partition, data/curated/dims/enrollment/
+{year}.parquet, recorded in a manifest with the fingerprint (size, mtime,
+sha256) of the source file it was built from and a hash of the
+methodology. build_enrollment() only recomputes the years whose source
+file or methodology changed; read_enrollment() serves the partitions to
+the later stages.
+
+FTE Calculation for EF years uses official IPEDS methodology:
+    FTE = FT_Undergrad + FT_Graduate +
+          (PT_Undergrad x 0.403543) +
+          (PT_Graduate x 0.361702)
+
+These factors are derived from NCES IPEDS survey methodology for calculating
+FTE from headcount enrollment by student level. The factors represent the
+average course load of part-time students relative to full-time students.
+
+Sources:
+    - IPEDS Survey Components: https://nces.ed.gov/ipeds/survey-components/8
+    - FTE Methodology: https://nces.ed.gov/ipeds/report-your-data/
+"""
+
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import RAW_DIR, CURATED_DIR
+from ipeds import member_path, read_member_table
+from raw_store import content_digest
+from utils import file_fingerprint, load_manifest, save_manifest
+
+# Directories
+IPEDS_RAW_DIR = RAW_DIR / "ipeds"
+ENROLLMENT_DIR = CURATED_DIR / "dims" / "enrollment"  # Per-year partitions + manifest
+
+# Years per source: DRVEF where available, EF for the years before it
+DRVEF_YEARS = [2021, 2022, 2023]
+EF_YEARS = [2015, 2016, 2017, 2018, 2019, 2020]
+ENROLLMENT_YEARS = EF_YEARS + DRVEF_YEARS
+
+# Columns of every partition, in order
+ENROLLMENT_COLUMNS = ['unitid', 'year', 'fte', 'enrollment_total', 'enrollment_ft', 'enrollment_pt']
+
+# =============================================================================
+# OFFICIAL IPEDS FTE CONVERSION FACTORS
+# =============================================================================
+# These factors convert part-time enrollment to full-time equivalent.
+# They represent the average course load of part-time students relative
+# to full-time students, derived from IPEDS survey methodology.
+#
+# Source: NCES IPEDS methodology for calculating FTE from headcount.
+# The factors are based on the ratio of credit hours taken by part-time
+# students compared to full-time students.
+
+PT_FACTOR_UNDERGRAD = 0.403543  # Part-time undergrad converts at ~40%
+PT_FACTOR_GRADUATE = 0.361702   # Part-time grad converts at ~36%
+
+# =============================================================================
+# EFALEVEL CODES
+# =============================================================================
+# EFALEVEL is the primary classification variable in EF files.
+# It combines attendance status (full-time/part-time) with student level.
+
+EFALEVEL_FT_UNDERGRAD = 22  # Full-time undergraduate
+EFALEVEL_FT_GRADUATE = 32   # Full-time graduate (including professional)
+EFALEVEL_PT_UNDERGRAD = 42  # Part-time undergraduate
+EFALEVEL_PT_GRADUATE = 52   # Part-time graduate (including professional)
+
+# Pivoted column name of each level used in the FTE formula
+EFALEVEL_COLUMNS = {
+    EFALEVEL_FT_UNDERGRAD: 'ft_undergrad',
+    EFALEVEL_FT_GRADUATE: 'ft_graduate',
+    EFALEVEL_PT_UNDERGRAD: 'pt_undergrad',
+    EFALEVEL_PT_GRADUATE: 'pt_graduate',
+}
+
+# The only EF part A columns read (typed by ipeds.EF_A_COLUMNS)
+EF_READ_COLUMNS = ['UNITID', 'EFALEVEL', 'EFTOTLT']
+
+# The DRVEF columns read (typed by ipeds.DRVEF_COLUMNS), and their names in
+# the enrollment schema
+DRVEF_RENAMES = {
+    'UNITID': 'unitid',
+    'FTE': 'fte',
+    'ENRTOT': 'enrollment_total',
+    'ENRFT': 'enrollment_ft',
+    'ENRPT': 'enrollment_pt',
+}
+
+
+# =============================================================================
+# PER-YEAR LOADERS
+# =============================================================================
+
+def fill_nulls(table: pa.Table, columns: List[str], value: int = 0) -> pa.Table:
+    """Replace nulls in some columns of a table, keeping their types."""
+    for name in columns:
+        index = table.schema.get_field_index(name)
+        table = table.set_column(index, name, pc.fill_null(table[name], value))
+    return table
+
+
+def load_drvef_file(year: int) -> pd.DataFrame:
+    """Load and parse a DRVEF file for a given year."""
+    # Read only the columns we need, typed int32 at parse time
+    table = read_member_table(IPEDS_RAW_DIR / str(year), f"drvef{year}", list(DRVEF_RENAMES))
+
+    if table is None:
+        print(f"  Warning: drvef{year}.csv not found")
+        return pd.DataFrame()
+
+    # Clean up: remove rows with missing FTE; missing headcounts count as 0
+    table = table.filter(pc.is_valid(table['FTE']))
+    table = fill_nulls(table, ['ENRTOT', 'ENRFT', 'ENRPT'])
+
+    df = table.rename_columns([DRVEF_RENAMES[name] for name in table.column_names]).to_pandas()
+    df['year'] = np.int16(year)
+
+    return df[ENROLLMENT_COLUMNS]
+
+
+def load_ef_file(year: int) -> pd.DataFrame:
+    """
+    Load EF file and calculate FTE using official IPEDS factors.
+
+    The calculation follows official IPEDS methodology:
+        FTE = FT_Undergrad + FT_Graduate +
+              (PT_Undergrad x 0.403543) +
+              (PT_Graduate x 0.361702)
+
+    Only UNITID, EFALEVEL and EFTOTLT are read, and the four levels are
+    pivoted into columns in one pass (one row per institution).
+
+    Args:
+        year: Academic year to process
+
+    Returns:
+        DataFrame with columns: unitid, year, fte, enrollment_total,
+        enrollment_ft, enrollment_pt
+    """
+    # Read the EF file (streamed Parquet if present, else CSV), typed at parse time
+    table = read_member_table(IPEDS_RAW_DIR / str(year), f"ef{year}a", EF_READ_COLUMNS)
+
+    if table is None:
+        print(f"  Warning: ef{year}a.csv not found")
+        return pd.DataFrame()
+    df = fill_nulls(table, ['EFTOTLT']).to_pandas()
+
+    # One column per level; institutions without a level get 0 for it.
+    # A repeated (UNITID, EFALEVEL) row keeps its first value, as pivot()
+    # rejects duplicate keys
+    levels = df[df['EFALEVEL'].isin(EFALEVEL_COLUMNS)].drop_duplicates(['UNITID', 'EFALEVEL'])
+    wide = (
+        levels.pivot(index='UNITID', columns='EFALEVEL', values='EFTOTLT')
+        .reindex(columns=list(EFALEVEL_COLUMNS))
+        .rename(columns=EFALEVEL_COLUMNS)
+        .fillna(0)
+    )
+
+    # Calculate FTE using official IPEDS factors
+    fte = (
+        wide['ft_undergrad'] +
+        wide['ft_graduate'] +
+        (wide['pt_undergrad'] * PT_FACTOR_UNDERGRAD) +
+        (wide['pt_graduate'] * PT_FACTOR_GRADUATE)
+    )
+
+    # Calculate totals for reporting and backwards compatibility
+    enrollment_ft = wide['ft_undergrad'] + wide['ft_graduate']
+    enrollment_pt = wide['pt_undergrad'] + wide['pt_graduate']
+
+    # Match the DRVEF output schema
+    merged = pd.DataFrame({
+        'fte': fte.round(),
+        'enrollment_total': enrollment_ft + enrollment_pt,
+        'enrollment_ft': enrollment_ft,
+        'enrollment_pt': enrollment_pt,
+    }).rename_axis('unitid').reset_index()
+    merged.insert(1, 'year', year)
+
+    return merged.astype({
+        'unitid': 'int32',
+        'year': 'int16',
+        'fte': 'int32',
+        'enrollment_total': 'int32',
+        'enrollment_ft': 'int32',
+        'enrollment_pt': 'int32',
+    })
+
+
+def year_source(year: int) -> Tuple[str, Callable[[int], pd.DataFrame]]:
+    """Get the IPEDS member stem a year is built from and its loader."""
+    if year in DRVEF_YEARS:
+        return f"drvef{year}", load_drvef_file
+    return f"ef{year}a", load_ef_file
+
+
+# =============================================================================
+# PARTITION STORE
+# =============================================================================
+
+def methodology_version() -> str:
+    """Hash the constants baked into built partitions."""
+    methodology = {
+        "pt_factors": [PT_FACTOR_UNDERGRAD, PT_FACTOR_GRADUATE],
+        "efalevels": EFALEVEL_COLUMNS,
+        "drvef_columns": DRVEF_RENAMES,
+        "columns": ENROLLMENT_COLUMNS,
+    }
+    encoded = json.dumps(methodology, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def build_enrollment(
+    years: List[int] = ENROLLMENT_YEARS,
+    workers: int = 4,
+    force: bool = False,
+    log: Callable[[str], None] = print
+) -> Dict[int, str]:
+    """
+    Bring the per-year enrollment partitions up to date.
+
+    A year is rebuilt when its source file's sha256, the file it is read
+    from (CSV or streamed Parquet) or the methodology changed, or its
+    partition is missing; with `force`, every year is rebuilt. Stale years
+    are loaded concurrently. A year whose source file is missing keeps its
+    existing partition.
+
+    Returns: {year: "built", "unchanged", "kept" (source missing) or "missing"}
+    """
+    manifest = load_manifest(ENROLLMENT_DIR / "manifest.json")
+    version = methodology_version()
+    statuses = {}
+    stale = {}
+
+    for year in years:
+        stem, _ = year_source(year)
+        previous = manifest.get(str(year), {})
+        source = member_path(IPEDS_RAW_DIR / str(year), stem)
+        if source is None:
+            has_partition = (ENROLLMENT_DIR / previous.get("partition", "")).is_file()
+            statuses[year] = "kept" if has_partition else "missing"
+            continue
+
+        fingerprint = file_fingerprint(source, previous.get("fingerprint"), content_digest)
+        entry = {
+            "source": source.relative_to(IPEDS_RAW_DIR).as_posix(),
+            "fingerprint": fingerprint,
+            "methodology_version": version,
+            "partition": f"{year}.parquet",
+        }
+        if (
+            not force
+            and previous.get("fingerprint", {}).get("sha256") == fingerprint["sha256"]
+            and all(previous.get(k) == entry[k] for k in ["source", "methodology_version", "partition"])
+            and (ENROLLMENT_DIR / entry["partition"]).exists()
+        ):
+            statuses[year] = "unchanged"
+            if previous["fingerprint"] != fingerprint:
+                manifest[str(year)] = {**previous, "fingerprint": fingerprint}
+            continue
+        stale[year] = entry
+
+    if stale:
+        ENROLLMENT_DIR.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            frames = executor.map(lambda year: year_source(year)[1](year), stale)
+            for (year, entry), df in zip(stale.items(), frames):
+                if len(df) == 0:
+                    statuses[year] = "missing"
+                    continue
+                partition_path = ENROLLMENT_DIR / entry["partition"]
+                tmp_path = partition_path.with_suffix(".parquet.tmp")
+                df.to_parquet(tmp_path, index=False)
+                tmp_path.replace(partition_path)
+                manifest[str(year)] = {**entry, "rows": len(df)}
+                statuses[year] = "built"
+                log(f"  {year}: built from {entry['source']} ({len(df):,} institutions)")
+
+    save_manifest(manifest, ENROLLMENT_DIR / "manifest.json")
+    return {year: statuses[year] for year in years}
+
+
+def read_enrollment(
+    columns: Optional[List[str]] = None,
+    years: Optional[List[int]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Read the enrollment partitions, sorted by unitid and year.
+
+    Returns: DataFrame (projected to `columns` if given), or None if no
+    partition has been built
+    """
+    manifest = load_manifest(ENROLLMENT_DIR / "manifest.json")
+    paths = [
+        ENROLLMENT_DIR / entry["partition"]
+        for year, entry in sorted(manifest.items(), key=lambda item: int(item[0]))
+        if years is None or int(year) in years
+    ]
+    paths = [p for p in paths if p.exists()]
+    if not paths:
+        return None
+
+    combined = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+    combined = combined.sort_values(['unitid', 'year']).reset_index(drop=True)
+    return combined[columns] if columns else combined
@@ -0,0 +1,214 @@
+"""
+Pooled HTTP session with retries and per-request timings for the downloaders.
+
+HTTPSession wraps one requests.Session shared by every download in a run:
+connections to ope.ed.gov and nces.ed.gov are kept alive and reused
+instead of paying a new TCP + TLS handshake per file, and transient
+failures (connection resets, timeouts, 429/5xx responses) are retried
+with exponential backoff, honoring Retry-After.
+
+Every request records a RequestTiming: connect time (name resolution plus
+TCP connect, as done by urllib3) and TLS handshake time (both zero when a
+pooled connection was reused), time to first byte, and - once the caller
+has streamed the body - bytes and throughput.
+summary() aggregates them for the end-of-run report.
+
+Works against any HTTP server, including a local stand-in, since it only
+hooks urllib3's connection setup.
+"""
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, List
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Retry policy defaults: attempts after the first, and base backoff (seconds)
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5
+
+# Responses worth retrying (rate limiting and transient server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Connection-setup timings of the request running on this thread
+_connection_timings = threading.local()
+
+
+class _TimedConnectionMixin:
+    """Record connect and TLS handshake time of new connections."""
+
+    def _new_conn(self):
+        # urllib3's create_connection resolves the host and connects, so the
+        # name lookup is part of the connect time rather than timed apart
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        timings = getattr(_connection_timings, "current", None)
+        if timings is not None:
+            timings["connect"] = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        timings = getattr(_connection_timings, "current", None)
+        if timings is not None:
+            timings["tls"] = max(0.0, time.perf_counter() - start - timings.get("connect", 0.0))
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools create timed connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTiming:
+    """Timings of one HTTP request (seconds) and, once streamed, its transfer."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.status = None
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.reused = True
+        self.retries = 0
+        self.bytes = 0
+        self.transfer = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Body bytes per second while streaming (0 if nothing was streamed)."""
+        return self.bytes / self.transfer if self.transfer > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "status": self.status,
+            "connect": self.connect,
+            "tls": self.tls,
+            "ttfb": self.ttfb,
+            "reused": self.reused,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "transfer": self.transfer,
+            "throughput": self.throughput,
+        }
+
+
+class HTTPSession:
+    """Connection-pooled requests.Session with a retry policy and request timings."""
+
+    def __init__(
+        self,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = 10
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.timings: List[RequestTiming] = []
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based), doubling each time."""
+        return self.backoff * (2 ** attempt)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a GET through the pooled session and record its timing.
+
+        The response carries its RequestTiming as `response.timing`; callers
+        that stream the body should fill in `bytes` and `transfer`.
+        """
+        timing = RequestTiming(url)
+        _connection_timings.current = {}
+        try:
+            response = self.session.get(url, **kwargs)
+        finally:
+            setup = _connection_timings.current
+            _connection_timings.current = None
+
+        timing.status = response.status_code
+        timing.reused = not setup
+        timing.connect = setup.get("connect", 0.0)
+        timing.tls = setup.get("tls", 0.0)
+        timing.ttfb = max(0.0, response.elapsed.total_seconds() - timing.connect - timing.tls)
+        history = getattr(getattr(response.raw, "retries", None), "history", None)
+        timing.retries = len(history) if history else 0
+
+        with self._lock:
+            self.timings.append(timing)
+        response.timing = timing
+        return response
+
+    def close(self) -> None:
+        self.session.close()
+
+    def summary(self) -> Dict[str, float]:
+        """Aggregate request timings for reporting."""
+        with self._lock:
+            timings = list(self.timings)
+
+        new_conns = [t for t in timings if not t.reused]
+        transfer = sum(t.transfer for t in timings)
+
+        def mean(values: List[float]) -> float:
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            "requests": len(timings),
+            "new_connections": len(new_conns),
+            "retries": sum(t.retries for t in timings),
+            "bytes": sum(t.bytes for t in timings),
+            "mean_connect": mean([t.connect for t in new_conns]),
+            "mean_tls": mean([t.tls for t in new_conns]),
+            "mean_ttfb": mean([t.ttfb for t in timings]),
+            "throughput": sum(t.bytes for t in timings) / transfer if transfer > 0 else 0.0,
+        }
+
+
+def print_network_summary(session: HTTPSession) -> None:
+    """Print the aggregated request timings of a session."""
+    stats = session.summary()
+    print(f"\nNetwork: {stats['requests']} requests over {stats['new_connections']} connections, "
+          f"{stats['retries']} retries")
+    print(f"  Connect (incl. DNS) {stats['mean_connect'] * 1000:.0f} ms, "
+          f"TLS {stats['mean_tls'] * 1000:.0f} ms, TTFB {stats['mean_ttfb'] * 1000:.0f} ms (mean)")
+    print(f"  {stats['bytes'] / (1024 * 1024):.1f} MB at {stats['throughput'] / (1024 * 1024):.2f} MB/s per stream")
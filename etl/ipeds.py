@@ -0,0 +1,261 @@
+"""
+IPEDS file layouts and typed readers shared by the downloader and transforms.
+
+Each IPEDS zip (e.g. EF2019A.zip) holds the data CSV (ef2019a.csv) plus
+revised variants (ef2019a_rv.csv) and dictionaries. The pipeline only reads
+a few columns of the DRVEF, EF part A, EFFY and HD data members, declared
+below with their types per file family.
+
+CSVs are parsed with pyarrow's multithreaded reader, keeping only the
+declared columns and casting them at parse time (int32/int16 codes and
+counts, float coordinates, strings). IPEDS conventions are handled there:
+header capitalization varies by year and is matched case-insensitively,
+blank cells and "." (not applicable / suppressed) are nulls, and the
+X-prefixed imputation flag columns that sit next to every variable are
+never read. Declared columns missing from a year's file come back null.
+
+01b_download_ipeds.py --parquet streams the DRVEF, EF and HD members out of
+the zip into typed Parquet next to it (ef2019a.parquet), without writing
+any CSV to disk; read_member_table() reads the Parquet when it is current
+and falls back to an extracted CSV otherwise.
+"""
+
+import csv
+import re
+import zipfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# Columns read from each family's data member, with their types
+DRVEF_COLUMNS = {
+    "UNITID": pa.int32(),
+    "ENRTOT": pa.int32(),
+    "FTE": pa.int32(),
+    "ENRFT": pa.int32(),
+    "ENRPT": pa.int32(),
+}
+EF_A_COLUMNS = {
+    "UNITID": pa.int32(),
+    "EFALEVEL": pa.int16(),
+    "EFTOTLT": pa.int32(),
+}
+EFFY_COLUMNS = {
+    "UNITID": pa.int32(),
+    "EFFYLEV": pa.int16(),
+    "LSTUDY": pa.int16(),
+    "EFYTOTLT": pa.int32(),
+}
+HD_COLUMNS = {
+    "UNITID": pa.int32(),
+    "INSTNM": pa.string(),
+    "CITY": pa.string(),
+    "STABBR": pa.string(),
+    "ZIP": pa.string(),
+    "SECTOR": pa.int16(),
+    "CONTROL": pa.int16(),
+    "ICLEVEL": pa.int16(),
+    "LATITUDE": pa.float64(),
+    "LONGITUD": pa.float64(),
+    # Carnegie basic classification, named after its edition (newest first)
+    "C21BASIC": pa.int16(),
+    "C18BASIC": pa.int16(),
+    "C15BASIC": pa.int16(),
+}
+
+# Zip family (filename prefix before the year) -> columns of its data member
+FAMILY_SCHEMAS = {
+    "DRVEF": DRVEF_COLUMNS,
+    "EF": EF_A_COLUMNS,
+    "EFFY": EFFY_COLUMNS,
+    "HD": HD_COLUMNS,
+}
+
+# Families 01b --parquet streams to Parquet (other zips are kept as-is)
+STREAMED_FAMILIES = {"DRVEF", "EF", "HD"}
+
+# Text encoding per family; HD names and cities are Latin-1, not UTF-8
+FAMILY_ENCODINGS = {"HD": "latin-1"}
+
+# Cell values treated as missing in IPEDS CSVs
+IPEDS_NULL_VALUES = ["", " ", "."]
+
+# Bytes per parse block; larger blocks give the reader's threads more to share
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def zip_family(filename: str) -> str:
+    """Get the file family of an IPEDS file name, e.g. "EF2019A" -> "EF"."""
+    match = re.match(r"[A-Za-z]+", filename)
+    return match.group(0).upper() if match else ""
+
+
+def family_schema(family: str) -> Dict[str, pa.DataType]:
+    """Get the declared columns of a file family."""
+    if family not in FAMILY_SCHEMAS:
+        raise ValueError(f"No IPEDS schema declared for {family!r} files")
+    return FAMILY_SCHEMAS[family]
+
+
+def data_member(zip_path: Path) -> Optional[str]:
+    """
+    Find the data CSV inside an IPEDS zip (not the _rv variant or dictionaries).
+
+    Returns: the member name, or None if the zip has no {stem}.csv
+    """
+    wanted = f"{zip_path.stem.lower()}.csv"
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for name in zf.namelist():
+            if name.lower() == wanted:
+                return name
+    return None
+
+
+def read_header(source: BinaryIO, encoding: str = "utf8") -> List[str]:
+    """Read the column names from the first line of a CSV stream."""
+    line = source.readline().decode(encoding).lstrip("\ufeff")
+    return next(csv.reader([line]), [])
+
+
+def typed_csv_options(
+    header: List[str],
+    columns: Dict[str, pa.DataType],
+    encoding: str = "utf8"
+) -> Tuple[pa_csv.ReadOptions, pa_csv.ConvertOptions]:
+    """
+    Build pyarrow CSV options that parse only `columns`, typed at parse time.
+
+    The file's header names are matched to the declared ones ignoring case
+    and surrounding spaces, and replaced by the declared spelling.
+    """
+    declared = {name.upper(): name for name in columns}
+    names = [declared.get(name.strip().upper(), name) for name in header]
+
+    read_options = pa_csv.ReadOptions(
+        column_names=names,
+        skip_rows=1,
+        encoding=encoding,
+        block_size=BLOCK_SIZE,
+    )
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=list(columns),
+        include_missing_columns=True,
+        column_types=columns,
+        null_values=IPEDS_NULL_VALUES,
+        strings_can_be_null=True,
+    )
+    return read_options, convert_options
+
+
+def read_csv_typed(path: Path, columns: Dict[str, pa.DataType], encoding: str = "utf8") -> pa.Table:
+    """Read `columns` of an IPEDS CSV into a typed Arrow table (multithreaded)."""
+    with open(path, 'rb') as f:
+        header = read_header(f, encoding)
+    read_options, convert_options = typed_csv_options(header, columns, encoding)
+    return pa_csv.read_csv(path, read_options=read_options, convert_options=convert_options)
+
+
+def stream_member_to_parquet(zip_path: Path, member: str, family: str, dest: Path) -> int:
+    """
+    Stream one CSV member of a zip into a typed Parquet file.
+
+    The member is decompressed and parsed batch by batch with pyarrow's CSV
+    reader, keeping only the family's declared columns (cast at parse
+    time), so neither the CSV nor the whole table is ever materialized. The
+    Parquet file is written under a temporary name and renamed into place.
+
+    Returns: number of rows written
+    """
+    columns = family_schema(family)
+    encoding = FAMILY_ENCODINGS.get(family, "utf8")
+    tmp_path = dest.with_suffix(".parquet.tmp")
+    rows = 0
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            with zf.open(member) as source:
+                header = read_header(source, encoding)
+            read_options, convert_options = typed_csv_options(header, columns, encoding)
+            with zf.open(member) as source:
+                reader = pa_csv.open_csv(
+                    source, read_options=read_options, convert_options=convert_options
+                )
+                with pq.ParquetWriter(str(tmp_path), reader.schema, compression="zstd") as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    tmp_path.replace(dest)
+    return rows
+
+
+def member_path(year_dir: Path, stem: str) -> Optional[Path]:
+    """
+    Find the file an IPEDS data member (e.g. "drvef2021") is read from.
+
+    The streamed {stem}.parquet wins when it is at least as new as an
+    extracted {stem}.csv; otherwise the CSV is used.
+
+    Returns: the path, or None if neither exists
+    """
+    parquet_path = year_dir / f"{stem}.parquet"
+    csv_path = year_dir / f"{stem}.csv"
+
+    if parquet_path.exists() and (
+        not csv_path.exists() or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime
+    ):
+        return parquet_path
+    if csv_path.exists():
+        return csv_path
+    return None
+
+
+def read_member_table(
+    year_dir: Path,
+    stem: str,
+    columns: Optional[List[str]] = None
+) -> Optional[pa.Table]:
+    """
+    Read an IPEDS data member (e.g. "drvef2021", "hd2022") as a typed table.
+
+    Reads the file chosen by member_path(), with the declared types of the
+    stem's family either way. Declared columns missing from the file (e.g.
+    a Parquet streamed before the column was declared) come back null.
+
+    Returns: Arrow table (projected to `columns` if given, else every
+    declared column), or None if neither file exists
+    """
+    family = zip_family(stem)
+    schema = family_schema(family)
+    selected = {name: schema[name] for name in (columns or schema)}
+
+    path = member_path(year_dir, stem)
+    if path is None:
+        return None
+    if path.suffix == ".parquet":
+        available = set(pq.read_schema(path).names)
+        table = pq.read_table(path, columns=[name for name in selected if name in available])
+        for name, dtype in selected.items():
+            if name not in available:
+                table = table.append_column(name, pa.nulls(table.num_rows, dtype))
+        return table.select(list(selected))
+    return read_csv_typed(path, selected, FAMILY_ENCODINGS.get(family, "utf8"))
+
+
+def read_member(
+    year_dir: Path,
+    stem: str,
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Read an IPEDS data member as a DataFrame (see read_member_table).
+
+    Integer columns with nulls come back as float64.
+    """
+    table = read_member_table(year_dir, stem, columns)
+    return table.to_pandas() if table is not None else None
@@ -0,0 +1,206 @@
+"""
+Content-addressed store of downloaded raw files.
+
+Every file the downloaders fetch into data/raw/ is also recorded in
+data/raw/_store/: the bytes as an immutable blob named by their sha256
+(objects/ab/abcdef...), and a catalog mapping the file's logical name -
+its path under data/raw/, e.g. "2023/Crime2023.csv" or
+"ipeds/2019/EF2019A.zip" - to that hash, its size and when it was added.
+
+Blobs are hard links to the working files where the filesystem allows, so
+the store costs no extra space; a republished file replaces the working
+copy while the old version stays in the store under its own hash.
+
+The catalog also records each working file's size and mtime, so stages
+that cache on content identity (the staging cache, the extraction
+manifest) can look a file's hash up instead of re-reading it, and
+verify() re-hashes every blob and working file in parallel to catch
+corruption, truncation and local edits.
+"""
+
+import functools
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from config import RAW_DIR
+from utils import sha256_file, load_json, safe_json_dump
+
+# Directory of the store under its root
+STORE_DIRNAME = "_store"
+
+# verify() outcomes
+OK = "ok"
+MODIFIED = "modified"      # Working file no longer matches its cataloged hash
+MISSING = "missing"        # Working file deleted (the blob can restore it)
+CORRUPT = "corrupt"        # Blob content no longer matches its name
+LOST = "lost"              # Blob deleted
+
+
+class RawStore:
+    """
+    sha256-named blobs plus a catalog of logical names, under root/_store/.
+
+    Catalog entries look like:
+        {"sha256": ..., "size": ..., "mtime_ns": ..., "url": ..., "added_at": ...}
+
+    Safe to update from download worker threads; the catalog is written
+    atomically after every change.
+    """
+
+    def __init__(self, root: Path = RAW_DIR):
+        self.root = root
+        self.store_dir = root / STORE_DIRNAME
+        self.objects_dir = self.store_dir / "objects"
+        self.catalog_path = self.store_dir / "catalog.json"
+        self._catalog = load_json(self.catalog_path) if self.catalog_path.exists() else {}
+        self._lock = threading.Lock()
+
+    def name(self, path: Path) -> str:
+        """Logical name of a working file: its path relative to the root."""
+        return path.resolve().relative_to(self.root.resolve()).as_posix()
+
+    def blob_path(self, sha256: str) -> Path:
+        """Path of the blob holding the content with this hash."""
+        return self.objects_dir / sha256[:2] / sha256
+
+    def entries(self, prefix: Union[str, Tuple[str, ...]] = "") -> Dict[str, dict]:
+        """Get a copy of the catalog entries whose logical name starts with prefix (or one of them)."""
+        with self._lock:
+            return {
+                name: dict(entry) for name, entry in sorted(self._catalog.items())
+                if name.startswith(prefix)
+            }
+
+    def lookup(self, path: Path) -> Optional[str]:
+        """
+        Get the cataloged sha256 of a working file without reading it.
+
+        Returns None if the file is not cataloged or its size or mtime
+        changed since it was added.
+        """
+        try:
+            name = self.name(path)
+            stat = path.stat()
+        except (ValueError, OSError):
+            return None
+        with self._lock:
+            entry = self._catalog.get(name)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["sha256"]
+        return None
+
+    def digest(self, path: Path) -> str:
+        """Get the sha256 of a file, from the catalog when it is current."""
+        return self.lookup(path) or sha256_file(path)
+
+    def add(self, path: Path, sha256: Optional[str] = None, url: Optional[str] = None) -> str:
+        """
+        Record a working file under its logical name and store its content.
+
+        `sha256` may be passed when the caller just computed it (e.g. the
+        downloader); otherwise it is looked up or computed. Adding a file
+        that is already cataloged and unchanged is cheap.
+
+        Returns: the file's sha256
+        """
+        name = self.name(path)
+        if sha256 is None:
+            sha256 = self.digest(path)
+
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            self._write_blob(path, blob)
+
+        stat = path.stat()
+        with self._lock:
+            previous = self._catalog.get(name, {})
+            entry = {
+                "sha256": sha256,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "url": url or previous.get("url"),
+                "added_at": (
+                    previous.get("added_at") if previous.get("sha256") == sha256
+                    else datetime.now(timezone.utc).isoformat(timespec="seconds")
+                ),
+            }
+            entry = {k: v for k, v in entry.items() if v is not None}
+            if entry != previous:
+                self._catalog[name] = entry
+                self._save()
+        return sha256
+
+    def verify(self, prefix: Union[str, Tuple[str, ...]] = "", workers: int = 4) -> Dict[str, str]:
+        """
+        Re-hash every cataloged blob and working file, in parallel.
+
+        A working file that is a hard link to its blob is hashed once.
+
+        Returns: {logical name: OK, MODIFIED, MISSING, CORRUPT or LOST}
+        """
+        entries = self.entries(prefix)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            statuses = executor.map(lambda item: self._verify_entry(*item), entries.items())
+            return dict(zip(entries, statuses))
+
+    def _verify_entry(self, name: str, entry: dict) -> str:
+        blob = self.blob_path(entry["sha256"])
+        path = self.root / name
+        if not blob.exists():
+            return LOST
+        if sha256_file(blob) != entry["sha256"]:
+            return CORRUPT
+        if not path.exists():
+            return MISSING
+        if os.path.samefile(path, blob) or sha256_file(path) == entry["sha256"]:
+            return OK
+        return MODIFIED
+
+    def _write_blob(self, path: Path, blob: Path) -> None:
+        """Hard-link (or, across filesystems, copy) a file into the store."""
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob.with_name(f"{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copy2(path, tmp_path)
+        tmp_path.replace(blob)
+
+    def _save(self) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_path.with_suffix(".json.tmp")
+        safe_json_dump(dict(sorted(self._catalog.items())), tmp_path)
+        tmp_path.replace(self.catalog_path)
+
+
+@functools.lru_cache(maxsize=None)
+def default_store() -> RawStore:
+    """The store under RAW_DIR, loaded once per process."""
+    return RawStore(RAW_DIR)
+
+
+def content_digest(path: Path) -> str:
+    """sha256 of a raw file, taken from the store's catalog when it is current."""
+    return default_store().digest(path)
+
+
+def print_verification(statuses: Dict[str, str]) -> bool:
+    """
+    Print the results of RawStore.verify().
+
+    Returns True if every entry verified OK.
+    """
+    if not statuses:
+        print("\nNo files recorded in the raw store yet.")
+        return True
+
+    problems = {name: status for name, status in statuses.items() if status != OK}
+    print(f"\nIntegrity: {len(statuses) - len(problems)}/{len(statuses)} files verified")
+    for name, status in problems.items():
+        print(f"  {status.upper()}: {name}")
+    return not problems
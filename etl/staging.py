@@ -0,0 +1,110 @@
+"""
+Columnar staging cache for raw DOE files.
+
+Decoding SAS7BDAT is the slowest part of stage 02. Each raw SAS file is
+decoded once and written to an Arrow IPC file under data/raw/_staged/,
+named by the sha256 of the source file. Later runs memory-map the staged
+copy and read only the columns they need, so re-running the transform after
+a config-only change does not touch the raw decoder at all.
+
+A changed source file gets a new hash and is re-staged automatically; stale
+staged files are never read and can be deleted at any time. Hashes of
+downloaded files are taken from the raw store's catalog (see raw_store.py)
+while they are current, so finding the staged copy does not re-read the
+raw file either.
+
+Yearly CSV downloads are not staged. pyarrow parses just the projected
+columns of a year's file, with their types, in tens of milliseconds, so
+a staged copy would save almost nothing. Staging the whole file would
+also mean guessing types for columns the pipeline never reads.
+"""
+
+import os
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from config import STAGED_DIR
+from raw_store import content_digest
+
+
+def staged_path(source: Path) -> Path:
+    """Get the staged Arrow IPC path for a raw file (keyed by content hash)."""
+    return STAGED_DIR / f"{content_digest(source)}.arrow"
+
+
+def _batch_schema(df: pd.DataFrame) -> pa.Schema:
+    """Infer an Arrow schema from a chunk, typing all-null columns as strings."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+
+def write_staged(chunks: Iterable[pd.DataFrame], dest: Path) -> bool:
+    """
+    Write DataFrame chunks to an Arrow IPC file, one record batch per chunk.
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted run never leaves a partial staged file behind.
+
+    Returns True if anything was written.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_suffix(f".{os.getpid()}.tmp")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = _batch_schema(chunk)
+                writer = pa.ipc.new_file(str(tmp_path), schema)
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if writer is None:
+        return False
+
+    writer.close()
+    tmp_path.replace(dest)
+    return True
+
+
+def iter_staged_chunks(path: Path, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Memory-map a staged file and yield its record batches as DataFrames.
+
+    Only `columns` are materialized (names missing from the file are ignored);
+    unselected columns are never copied out of the mapping.
+    """
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        if columns is None:
+            keep = reader.schema.names
+        else:
+            wanted = set(columns)
+            keep = [c for c in reader.schema.names if c in wanted]
+
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).select(keep).to_pandas()
+
+
+def read_staged_table(path: Path, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Memory-map a staged file as a single Arrow table (zero-copy).
+
+    Only `columns` are selected (names missing from the file are ignored).
+    The table's buffers point into the mapping, so handing it to DuckDB or
+    another Arrow consumer does not copy the data.
+    """
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    if columns is None:
+        return table
+    wanted = set(columns)
+    return table.select([c for c in table.schema.names if c in wanted])
@@ -3,8 +3,9 @@ Shared utility functions for ETL scripts.
 """
 
 import json
+import hashlib
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 from datetime import datetime
 
 
@@ -41,6 +42,52 @@ def load_json(filepath: Path) -> Any:
         return json.load(f)
 
 
+def sha256_file(filepath: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the hex sha256 digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(
+    filepath: Path,
+    previous: Optional[dict] = None,
+    digest: Callable[[Path], str] = sha256_file
+) -> dict:
+    """
+    Fingerprint a source file by size, mtime and content hash.
+
+    The sha256 from `previous` is reused when size and mtime are unchanged,
+    so unchanged files are not re-hashed on every run. `digest` computes
+    the hash otherwise (e.g. raw_store.content_digest, which reuses the raw
+    store's catalog).
+    """
+    stat = filepath.stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = digest(filepath)
+    return fingerprint
+
+
+def load_manifest(manifest_path: Path) -> dict:
+    """Load a JSON manifest, or an empty one if the file does not exist."""
+    if not manifest_path.exists():
+        return {}
+    return load_json(manifest_path)
+
+
+def save_manifest(manifest: dict, manifest_path: Path) -> None:
+    """Write a JSON manifest atomically (temporary file, then rename)."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    safe_json_dump(manifest, tmp_path)
+    tmp_path.replace(manifest_path)
+
+
 def file_size_str(size_bytes: int) -> str:
     """Convert file size to human-readable string."""
     for unit in ['B', 'KB', 'MB', 'GB']:
@@ -0,0 +1,314 @@
+"""
+DuckDB connections for the pipeline stages, optionally backed by a
+persistent warehouse file.
+
+Stages 03-07 query the curated Parquet outputs (facts, dims, aggregates,
+rankings) through Warehouse.source(name), which returns the SQL relation
+to select from:
+
+    - in memory (the default): read_parquet('...') over the files, so
+      every query scans them again
+    - persistent (USE_WAREHOUSE in config.py): a table in
+      data/curated/warehouse.duckdb, loaded from the Parquet files the
+      first time a stage asks for it and reloaded only when those files
+      change (count, size or mtime)
+
+The warehouse also carries indexes on unitid and a few convenience views,
+so analysts can open it directly:
+
+    duckdb data/curated/warehouse.duckdb "SELECT * FROM school_year_offense LIMIT 5"
+
+Parquet stays the interchange format: every stage still writes it, and
+05_generate_json.py and the frontend never need DuckDB. Connections are
+opened with the DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS and DUCKDB_TEMP_DIR
+settings from config.py.
+
+Usage:
+    python warehouse.py                      # Load or refresh every dataset
+    python warehouse.py --force              # Reload every dataset
+    python warehouse.py --memory-limit 4GB --threads 4 --temp-directory /scratch/duckdb
+"""
+
+import sys
+import argparse
+import duckdb
+import pyarrow as pa
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    CURATED_DIR, USE_WAREHOUSE, WAREHOUSE_PATH,
+    DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS, DUCKDB_TEMP_DIR
+)
+
+# Dataset (warehouse table) -> glob of its Parquet files under CURATED_DIR
+DATASETS = {
+    "facts": "facts/incidents/**/*.parquet",
+    "dim_institution": "dims/dim_institution.parquet",
+    "dim_offense": "dims/dim_offense.parquet",
+    "dim_enrollment": "dims/enrollment/*.parquet",
+    "agg_school_year_offense": "aggs/agg_school_year_offense.parquet",
+    "agg_ivy_rankings": "aggs/agg_ivy_rankings.parquet",
+    "agg_state_rankings": "aggs/agg_state_rankings.parquet",
+    "agg_national_rankings": "aggs/agg_national_rankings.parquet",
+}
+
+# Facts written before the partitioned layout
+LEGACY_FACTS_PATTERN = "facts/*.parquet"
+
+# Extra read_parquet() options per dataset; the partitioned facts keep
+# year and offense_family only in their year=/offense_family= directories
+READ_OPTIONS = {
+    "facts": "hive_partitioning = true, hive_types = {'year': SMALLINT, 'offense_family': VARCHAR}",
+}
+
+# Columns indexed in the warehouse, per table
+INDEXES = {
+    "dim_institution": ["unitid"],
+    "agg_school_year_offense": ["unitid"],
+}
+
+# Convenience views, created once every table they read is loaded
+VIEWS = {
+    "school_year_offense": """
+        SELECT a.*, d.state, d.sector, d.is_main_campus, d.ivy_league
+        FROM agg_school_year_offense a
+        LEFT JOIN dim_institution d USING (unitid)
+    """,
+    "incidents": """
+        SELECT f.*, d.institution_name, d.state, o.display_order
+        FROM facts f
+        LEFT JOIN dim_institution d USING (unitid)
+        LEFT JOIN dim_offense o USING (offense)
+    """,
+}
+VIEW_TABLES = {
+    "school_year_offense": ["agg_school_year_offense", "dim_institution"],
+    "incidents": ["facts", "dim_institution", "dim_offense"],
+}
+
+
+def sql_string(value) -> str:
+    """Quote a value as a SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def dataset_pattern(name: str) -> str:
+    """Get the glob of a dataset's Parquet files, relative to CURATED_DIR."""
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset {name!r}")
+    if name == "facts" and not (CURATED_DIR / "facts" / "incidents").exists():
+        return LEGACY_FACTS_PATTERN
+    return DATASETS[name]
+
+
+def parquet_relation(name: str) -> str:
+    """Get the read_parquet() call over a dataset's Parquet files."""
+    pattern = dataset_pattern(name)
+    args = sql_string(CURATED_DIR / pattern)
+    if pattern == DATASETS[name] and name in READ_OPTIONS:
+        args += f", {READ_OPTIONS[name]}"
+    return f"read_parquet({args})"
+
+
+def dataset_fingerprint(name: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identify the current state of a dataset's Parquet files.
+
+    Returns: (file count, total bytes, newest mtime_ns), or None if the
+    dataset has no files
+    """
+    files = [path.stat() for path in CURATED_DIR.glob(dataset_pattern(name))]
+    if not files:
+        return None
+    return len(files), sum(st.st_size for st in files), max(st.st_mtime_ns for st in files)
+
+
+class Warehouse:
+    """
+    A DuckDB connection plus the relation each curated dataset is read from.
+
+    With a `path`, datasets are tables in that database file, loaded on
+    first use and refreshed when their Parquet files change (recorded in
+    its _datasets table). Without one, the connection is in memory and
+    datasets are read straight from Parquet.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = WAREHOUSE_PATH if USE_WAREHOUSE else None,
+        memory_limit: Optional[str] = DUCKDB_MEMORY_LIMIT,
+        threads: Optional[int] = DUCKDB_THREADS,
+        temp_directory: Optional[Path] = DUCKDB_TEMP_DIR
+    ):
+        config = {}
+        if memory_limit:
+            config["memory_limit"] = str(memory_limit)
+        if threads:
+            config["threads"] = int(threads)
+        if temp_directory:
+            config["temp_directory"] = str(temp_directory)
+
+        self.path = path
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = duckdb.connect(str(path) if path is not None else ":memory:", config=config)
+
+        if path is not None:
+            self.con.execute("""
+                CREATE TABLE IF NOT EXISTS _datasets (
+                    name VARCHAR PRIMARY KEY,
+                    files INTEGER,
+                    bytes BIGINT,
+                    mtime_ns BIGINT,
+                    loaded_at TIMESTAMP
+                )
+            """)
+
+    def __enter__(self) -> "Warehouse":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.con.close()
+
+    def execute(self, query: str, parameters: Optional[list] = None) -> duckdb.DuckDBPyConnection:
+        """Run a query on the connection."""
+        return self.con.execute(query, parameters)
+
+    def fetch_arrow(self, query: str, parameters: Optional[list] = None) -> pa.Table:
+        """Run a query and fetch its result as an Arrow table."""
+        result = self.con.execute(query, parameters).arrow()
+        # Newer DuckDB versions return a RecordBatchReader, older ones a Table
+        return result.read_all() if isinstance(result, pa.RecordBatchReader) else result
+
+    def has_table(self, name: str) -> bool:
+        """Check whether the database holds a table or view called `name`."""
+        return self.con.execute(
+            "SELECT 1 FROM duckdb_tables() WHERE table_name = ? "
+            "UNION ALL SELECT 1 FROM duckdb_views() WHERE view_name = ?",
+            [name, name]
+        ).fetchone() is not None
+
+    def source(self, name: str) -> str:
+        """
+        Get the SQL relation to select a dataset from.
+
+        In a persistent warehouse this is the dataset's table, refreshed
+        first if its Parquet files changed; otherwise (or if the dataset
+        was never loaded and has no files) it is a read_parquet() call.
+        """
+        if self.path is not None:
+            self.refresh(name)
+            if self.has_table(name):
+                return name
+        return parquet_relation(name)
+
+    def refresh(self, name: str, force: bool = False) -> bool:
+        """
+        Load a dataset's Parquet files into its table if they changed.
+
+        A dataset whose files are gone keeps its last loaded table.
+
+        Returns: True if the table was (re)loaded
+        """
+        if self.path is None:
+            return False
+
+        fingerprint = dataset_fingerprint(name)
+        if fingerprint is None:
+            return False
+        loaded = self.con.execute(
+            "SELECT files, bytes, mtime_ns FROM _datasets WHERE name = ?", [name]
+        ).fetchone()
+        if not force and loaded == fingerprint and self.has_table(name):
+            return False
+
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            self.con.execute(f"""
+                CREATE OR REPLACE TABLE {name} AS
+                SELECT * FROM {parquet_relation(name)}
+            """)
+            for column in INDEXES.get(name, []):
+                self.con.execute(f"CREATE INDEX {name}_{column}_idx ON {name} ({column})")
+            self.con.execute(
+                "INSERT OR REPLACE INTO _datasets VALUES (?, ?, ?, ?, now())", [name, *fingerprint]
+            )
+            self.con.execute("COMMIT")
+        except BaseException:
+            self.con.execute("ROLLBACK")
+            raise
+        return True
+
+    def create_views(self) -> List[str]:
+        """
+        Create the convenience views whose tables are all loaded.
+
+        Returns: names of the views created
+        """
+        created = []
+        for view, query in VIEWS.items():
+            if all(self.has_table(table) for table in VIEW_TABLES[view]):
+                self.con.execute(f"CREATE OR REPLACE VIEW {view} AS {query}")
+                created.append(view)
+        return created
+
+    def build(self, force: bool = False) -> Dict[str, str]:
+        """
+        Load or refresh every dataset, then (re)create the views.
+
+        Returns: {dataset: "loaded" | "unchanged" | "missing"}
+        """
+        statuses = {}
+        for name in DATASETS:
+            if self.refresh(name, force):
+                statuses[name] = "loaded"
+            elif self.has_table(name):
+                statuses[name] = "unchanged"
+            else:
+                statuses[name] = "missing"
+        self.create_views()
+        return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load the curated Parquet outputs into the DuckDB warehouse"
+    )
+    parser.add_argument("--path", type=Path, default=WAREHOUSE_PATH,
+                        help=f"Warehouse database file (default: {WAREHOUSE_PATH})")
+    parser.add_argument("--force", action="store_true", help="Reload every dataset")
+    parser.add_argument("--memory-limit", default=DUCKDB_MEMORY_LIMIT, help="DuckDB memory_limit, e.g. 4GB")
+    parser.add_argument("--threads", type=int, default=DUCKDB_THREADS, help="DuckDB worker threads")
+    parser.add_argument("--temp-directory", type=Path, default=DUCKDB_TEMP_DIR,
+                        help="Directory DuckDB spills to when over the memory limit")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("DuckDB Warehouse")
+    print("=" * 60)
+    print(f"Warehouse: {args.path}")
+
+    with Warehouse(args.path, args.memory_limit, args.threads, args.temp_directory) as warehouse:
+        statuses = warehouse.build(args.force)
+        for name, status in statuses.items():
+            if status == "missing":
+                print(f"  {name:<26} missing (no Parquet files)")
+                continue
+            rows = warehouse.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            print(f"  {name:<26} {status:<9} {rows:>12,} rows")
+        views = [name for name in VIEWS if warehouse.has_table(name)]
+        if views:
+            print(f"  Views: {', '.join(views)}")
+
+    if not USE_WAREHOUSE:
+        print("\nNote: USE_WAREHOUSE is False in config.py, so stages 03-07 still read Parquet directly.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())